@@ -0,0 +1,173 @@
+from __future__ import annotations
+#from typing import Self  # available from Python 3.11
+import json
+import os
+import pygame
+
+
+# Images of the tiles (name.png), the wall tile is drawn
+IMAGE_NAMES = ["door", "coin", "robot", "monster"]
+
+# Zoom levels, 1 is the original size of the images
+ZOOMS = [0.5, 0.75, 1]
+
+# Increase, when the way the atlas is drawn changes: the atlases cached before are not used then
+ATLAS_VERSION = 1
+
+CACHE_DIR = os.path.join(os.environ.get("XDG_CACHE_HOME") or os.path.join(os.path.expanduser("~"), ".cache"),
+                         "the_way")
+
+
+def draw_wall(size: int, color: pygame.color.Color, scale: float = 1) -> pygame.surface.Surface:
+    """Draw the square image of a wall brick with the side size. Return pygame object.
+    The offsets of the brick from the edges (in pixels at zoom 1) are multiplied by scale.
+    """
+    wall = pygame.Surface((size, size))
+    wall.fill(color)
+    brick_points = [(8, 6), (4, 18), (4, size/scale-16), (6, size/scale-8), (size/scale-6, size/scale-4),
+                    (size/scale-4, size/scale-6), (size/scale-4, 6), (size/scale-6, 4)]
+    pygame.draw.polygon(wall, (100, 30, 30), [(round(x*scale), round(y*scale)) for x, y in brick_points])
+    return wall
+
+
+class SpriteAtlas:
+    """
+    SpriteAtlas() -> new SpriteAtlas object with the images IMAGE_NAMES from the working directory
+    and the wall, for all the ZOOMS, cached in CACHE_DIR.
+    SpriteAtlas(directory, names, zooms, cache_dir) -> the same with the given images, zoom levels
+    and cache directory (None for no cache).
+
+    SpriteAtlas packs all the tiles of all the zoom levels into one surface, one row per zoom level.
+    The size of the square building block at zoom 1 is based on the robot image.
+    The atlas is saved to the cache directory (atlas.png and atlas.json), later the cached atlas
+    is used as long as the source images (size and modification time), names and zooms are the same,
+    so the images are not loaded, scaled and drawn again.
+
+    Attributes:
+    surface (the atlas), zooms, square_sizes (zoom -> size of the square),
+    tiles (zoom -> {name: pygame.Rect of the tile in the atlas}), from_cache (True, if loaded from the cache).
+
+    Methods:
+    images(zoom), square_size(zoom), nearest_zoom(zoom).
+    """
+    def __init__(self, directory: str = "", names: list = IMAGE_NAMES, zooms: list = ZOOMS,
+                 cache_dir: str | None = CACHE_DIR) -> None:
+        self.zooms = sorted(zooms)
+        self.__names = list(names)
+        self.__paths = {name: os.path.join(directory, name + ".png") for name in self.__names}
+        self.__cache_dir = cache_dir
+        self.__key = self.__cache_key()
+        self.from_cache = self.__load_cache()
+        if not self.from_cache:
+            self.__build()
+            self.__save_cache()
+        if pygame.display.get_surface() is not None:
+            # Blitting is faster from the surface in the display format
+            self.surface = self.surface.convert_alpha()
+        # Subsurfaces share the pixels of the atlas
+        self.__images = {zoom: {name: self.surface.subsurface(rect) for name, rect in self.tiles[zoom].items()}
+                         for zoom in self.zooms}
+
+    def __cache_key(self) -> dict:
+        sources = {}
+        for name, path in self.__paths.items():
+            stat = os.stat(path)
+            sources[name] = [stat.st_size, stat.st_mtime_ns]
+        return {"version": ATLAS_VERSION, "sources": sources, "zooms": self.zooms}
+
+    def __load_cache(self) -> bool:
+        """Load the atlas from the cache, if it is there and up to date. Return True, if loaded."""
+        if self.__cache_dir is None:
+            return False
+        try:
+            with open(os.path.join(self.__cache_dir, "atlas.json")) as file:
+                index = json.load(file)
+            if index["key"] != self.__key:
+                return False
+            surface = pygame.image.load(os.path.join(self.__cache_dir, "atlas.png"))
+        except (OSError, ValueError, KeyError, pygame.error):
+            return False
+        self.surface = surface
+        self.square_sizes = {}
+        self.tiles = {}
+        for variant in index["variants"]:
+            self.square_sizes[variant["zoom"]] = variant["square_size"]
+            self.tiles[variant["zoom"]] = {name: pygame.Rect(rect) for name, rect in variant["tiles"].items()}
+        return True
+
+    def __save_cache(self) -> None:
+        """Save the atlas to the cache directory. Errors are ignored: the cache is not necessary."""
+        if self.__cache_dir is None:
+            return
+        variants = [{"zoom": zoom, "square_size": self.square_sizes[zoom],
+                     "tiles": {name: list(rect) for name, rect in self.tiles[zoom].items()}}
+                    for zoom in self.zooms]
+        try:
+            os.makedirs(self.__cache_dir, exist_ok=True)
+            # Write into temporary files first, so a half-written atlas is never used
+            image_path = os.path.join(self.__cache_dir, "atlas.png")
+            pygame.image.save(self.surface, image_path + ".tmp.png")
+            os.replace(image_path + ".tmp.png", image_path)
+            index_path = os.path.join(self.__cache_dir, "atlas.json")
+            with open(index_path + ".tmp", "w") as file:
+                json.dump({"key": self.__key, "variants": variants}, file)
+            os.replace(index_path + ".tmp", index_path)
+        except (OSError, pygame.error):
+            pass
+
+    def __build(self) -> None:
+        """Load the source images, scale them for every zoom, draw the walls and pack all into one surface."""
+        sources = {}
+        for name, path in self.__paths.items():
+            image = pygame.image.load(path)
+            # Scaling smoothly needs 32 bit pixels, the image can be e.g. with a palette
+            converted = pygame.Surface(image.get_size(), pygame.SRCALPHA)
+            converted.blit(image, (0, 0))
+            sources[name] = converted
+        base_size = sources["robot"].get_height() + 4
+
+        variants = []
+        for zoom in self.zooms:
+            size = round(base_size * zoom)
+            tiles = {name: pygame.transform.smoothscale(image, (max(1, round(image.get_width() * zoom)),
+                                                                 max(1, round(image.get_height() * zoom))))
+                     for name, image in sources.items()}
+            tiles["wall"] = draw_wall(size, pygame.Color("black"), zoom)
+            variants.append((zoom, size, tiles))
+
+        # One row per zoom, the tiles from left to right
+        width = max(sum(tile.get_width() for tile in tiles.values()) for _, _, tiles in variants)
+        height = sum(size for _, size, _ in variants)
+        self.surface = pygame.Surface((width, height), pygame.SRCALPHA)
+        self.square_sizes = {}
+        self.tiles = {}
+        y = 0
+        for zoom, size, tiles in variants:
+            self.square_sizes[zoom] = size
+            self.tiles[zoom] = {}
+            x = 0
+            for name, tile in tiles.items():
+                self.tiles[zoom][name] = self.surface.blit(tile, (x, y))
+                x += tile.get_width()
+            y += size
+
+    def nearest_zoom(self, zoom: float) -> float:
+        """Return the zoom level of the atlas nearest to the given zoom."""
+        return min(self.zooms, key=lambda available: abs(available - zoom))
+
+    def square_size(self, zoom: float = 1) -> int:
+        """Return the size of the square building block for the zoom."""
+        return self.square_sizes[self.nearest_zoom(zoom)]
+
+    def images(self, zoom: float = 1) -> dict:
+        """Return dictionary {name: image} of the tiles for the zoom (subsurfaces of the atlas)."""
+        return self.__images[self.nearest_zoom(zoom)]
+
+
+if __name__ == "__main__":
+    from time import perf_counter
+    for attempt in ("first", "second"):
+        start = perf_counter()
+        atlas = SpriteAtlas()
+        print(f"{attempt}: {(perf_counter() - start)*1000:.1f} ms, from cache: {atlas.from_cache}, "
+              f"square sizes: {atlas.square_sizes}")
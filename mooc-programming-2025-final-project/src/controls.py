@@ -0,0 +1,118 @@
+import pygame
+from collections import deque
+from moving_objects import Robot
+
+
+# Actions of the robot which can be bound to keys
+ACTIONS = ["left", "right", "up", "down", "break_wall"]
+
+# Event types the game processes, the rest are not put into the pygame event queue
+EVENT_TYPES = [pygame.QUIT, pygame.KEYDOWN, pygame.KEYUP]
+
+
+def allow_game_events() -> None:
+    """Restrict the pygame event queue to EVENT_TYPES (mouse motion, window events etc. are dropped)."""
+    pygame.event.set_blocked(None)
+    pygame.event.set_allowed(EVENT_TYPES)
+
+
+class RobotControls:
+    """
+    RobotControls(Robot) -> new RobotControls object controlling the robot
+    with the default keys: j (left), l (right), i (up), k (down), Space (break wall).
+    RobotControls(Robot, bindings) -> the same with the bindings {key: action} (action from ACTIONS).
+    RobotControls(Robot, repeat_interval=S) -> the same, a held key moves the robot every S seconds.
+
+    RobotControls is the keyboard (pygame) layer for the Robot.
+    Events only change the state of the controls (keys pressed and held, wall to break);
+    the robot is moved by update() once per simulation tick. Every key press moves the robot
+    by one cell, even if the key is released before the next tick (at most MAX_PRESSES
+    presses wait for the ticks). A held key moves it again every repeat_interval seconds,
+    so the speed of the robot does not depend on the tick rate.
+
+    Attributes:
+    robot (can be replaced, e.g. for the new level), bindings, repeat_interval.
+
+    Methods:
+    process_event(event), update(elapsed), set_keys(left, right, up, down, break_wall), describe().
+    """
+    # Maximum amount of key presses waiting for the ticks, the rest are dropped
+    MAX_PRESSES = 4
+
+    def __init__(self, robot: Robot | None = None, bindings: dict | None = None,
+                 repeat_interval: float = 0.15) -> None:
+        self.robot = robot
+        if bindings is None:
+            self.set_keys(pygame.K_j, pygame.K_l, pygame.K_i, pygame.K_k, pygame.K_SPACE)
+        else:
+            self.bindings = dict(bindings)
+        self.repeat_interval = repeat_interval
+        self.__held = {"left": False, "right": False, "up": False, "down": False}
+        # Directions pressed since the last update(), applied one per update()
+        self.__presses = deque(maxlen=self.MAX_PRESSES)
+        # Seconds until a held key moves the robot again
+        self.__repeat_timer = 0.0
+        self.__break_wall = False
+
+    def set_keys(self, left_k, right_k, up_k, down_k, break_wall_k) -> None:
+        self.bindings = dict(zip([left_k, right_k, up_k, down_k, break_wall_k], ACTIONS))
+
+    def process_event(self, event: pygame.event.Event) -> None:
+        """Process event: remember the key presses and the state of the bound keys."""
+        if event.type not in (pygame.KEYDOWN, pygame.KEYUP):
+            return
+        action = self.bindings.get(event.key)
+        if action is None:
+            return
+        if action == "break_wall":
+            if event.type == pygame.KEYDOWN:
+                self.__break_wall = True
+            return
+        if event.type == pygame.KEYDOWN:
+            self.__presses.append(action)
+        self.__held[action] = event.type == pygame.KEYDOWN
+
+    def update(self, elapsed: float = 0.0) -> None:
+        """Apply the state of the controls to the robot, elapsed seconds after the previous update():
+        break the wall, if requested, else move the robot by the next key press waiting
+        or, when it is time to repeat, in the direction of the keys held.
+        """
+        if self.robot is None:
+            return
+        held = self.__held
+        self.__repeat_timer -= elapsed
+        if self.__presses:
+            action = self.__presses.popleft()
+            direction = tuple(action == name for name in held)
+            self.__repeat_timer = self.repeat_interval
+        elif any(held.values()) and self.__repeat_timer <= 0:
+            direction = tuple(held.values())
+            self.__repeat_timer = max(self.__repeat_timer + self.repeat_interval, 0.0)
+        else:
+            direction = None
+        if self.__break_wall:
+            self.__break_wall = False
+            self.robot.set_direction(*(direction or tuple(held.values())))
+            self.robot.break_wall()
+            # Breaking the wall stops the robot in that direction until the key is pressed again
+            for name, flag in zip(held, self.robot.direction):
+                held[name] = held[name] and flag
+            return
+        if direction is not None:
+            self.robot.set_direction(*direction)
+            self.robot.move_robot()
+
+    def release_all(self) -> None:
+        """Forget the keys pressed and held, e.g. when the robot is replaced."""
+        for action in self.__held:
+            self.__held[action] = False
+        self.__presses.clear()
+        self.__repeat_timer = 0.0
+        self.__break_wall = False
+
+    def describe(self) -> str:
+        """Return the text describing the bindings, e.g. "Left:  j     Right:  l ..."."""
+        names = {"left": "Left", "right": "Right", "up": "Up", "down": "Down", "break_wall": "Break wall"}
+        keys = {action: key for key, action in self.bindings.items()}
+        return (' '*5).join(f"{names[action]}:  {pygame.key.name(keys[action])}"
+                            for action in ACTIONS if action in keys)
@@ -0,0 +1,227 @@
+from __future__ import annotations
+#from typing import Self  # available from Python 3.11
+import inspect
+import sys
+import tracemalloc
+from array import array
+from collections import deque
+from contextlib import contextmanager
+
+
+# Flags of the code objects, whose frames survive returns (CO_GENERATOR, CO_COROUTINE, CO_ASYNC_GENERATOR)
+GENERATOR_FLAGS = inspect.CO_GENERATOR | inspect.CO_COROUTINE | inspect.CO_ASYNC_GENERATOR
+
+
+class FrameAllocations:
+    """
+    FrameAllocations() -> new FrameAllocations object with no allocations.
+
+    Allocations done during one frame, attributed by subsystem.
+
+    Attributes:
+    allocated (subsystem -> bytes allocated during the frame, including the temporary objects
+    freed before the end of the frame, see AllocationTracker),
+    allocations (subsystem -> number of calls (or returns) of the subsystem's code, which allocated memory),
+    retained (subsystem -> number of memory blocks (objects) allocated and still alive at the end of the frame),
+    retained_size (subsystem -> bytes of these blocks),
+    peak (maximum bytes allocated at once during the frame, including the temporary objects).
+
+    Methods:
+    total_allocated(), total_retained(), total_retained_size().
+    """
+    def __init__(self) -> None:
+        self.allocated = {}
+        self.allocations = {}
+        self.retained = {}
+        self.retained_size = {}
+        self.peak = 0
+
+    def add(self, subsystem: str, size: int) -> None:
+        self.allocated[subsystem] = self.allocated.get(subsystem, 0) + size
+        self.allocations[subsystem] = self.allocations.get(subsystem, 0) + 1
+
+    def add_retained(self, subsystem: str, blocks: int, size: int) -> None:
+        self.retained[subsystem] = self.retained.get(subsystem, 0) + blocks
+        self.retained_size[subsystem] = self.retained_size.get(subsystem, 0) + size
+
+    def total_allocated(self) -> int:
+        return sum(self.allocated.values())
+
+    def total_retained(self) -> int:
+        return sum(self.retained.values())
+
+    def total_retained_size(self) -> int:
+        return sum(self.retained_size.values())
+
+    def __str__(self) -> str:
+        lines = [f"{name}: {self.allocated.get(name, 0)} B allocated ({self.allocations.get(name, 0)} times), "
+                 f"{self.retained.get(name, 0)} blocks retained ({self.retained_size.get(name, 0)} B)"
+                 for name in sorted(set(self.allocated) | set(self.retained))]
+        lines.append(f"peak: {self.peak} B")
+        return '\n'.join(lines)
+
+
+class AllocationTracker:
+    """
+    AllocationTracker() -> new AllocationTracker object with the default subsystems.
+    AllocationTracker(subsystems) -> the same with subsystems given as a dictionary
+    {subsystem name: list of classes or functions}.
+
+    AllocationTracker is a diagnostics mode based on tracemalloc: allocations done during
+    a frame are attributed to the subsystem, whose code (the innermost one belonging to any subsystem)
+    made them. Other allocations go to "other".
+    Allocations are counted as they happen: a profile function reads the peak of the traced memory
+    on every call and return of Python code, so the temporary objects (e.g. tuples and lists
+    freed before the end of the frame) are counted too. The blocks still alive at the end
+    of the frame are found by comparing tracemalloc snapshots (retained).
+    Only the thread running the frame is profiled (allocations of other threads at the same time
+    are attributed to the running subsystem).
+
+    Attributes:
+    frames (FrameAllocations of the last max_frames tracked frames).
+
+    Methods:
+    start(), stop(), frame() (context manager), assert_frame_allocations(max_size, subsystem).
+    """
+    def __init__(self, subsystems: dict | None = None, traceback_depth: int = 10, max_frames: int = 600) -> None:
+        if subsystems is None:
+            subsystems = self.default_subsystems()
+        self.traceback_depth = traceback_depth
+        self.frames = deque(maxlen=max_frames)
+        # filename -> list of (first line, last line, subsystem)
+        self.__ranges = {}
+        for name, objects in subsystems.items():
+            for code_object in objects:
+                lines, first = inspect.getsourcelines(code_object)
+                filename = inspect.getsourcefile(code_object)
+                self.__ranges.setdefault(filename, []).append((first, first + len(lines) - 1, name))
+        self.__started = False
+        # Code object -> subsystem (or None), filled while profiling
+        self.__codes = {}
+        self.__stack = [(None, "other")]
+        self.__allocations = None
+        self.__memory = array('q', [0, 0, 0, 0])
+
+    @staticmethod
+    def default_subsystems() -> dict:
+        """Return the subsystems of TheWay: maze access, monster AI, robot and rendering."""
+        from maze import Maze
+        from moving_objects import Robot, Monster
+        from scheduler import MonsterScheduler
+        subsystems = {"maze": [Maze], "monster_ai": [Monster, MonsterScheduler], "robot": [Robot]}
+        try:
+            from the_way import TheWay
+            from renderer import TileRenderer
+        except ImportError:  # pygame is not installed
+            return subsystems
+        subsystems["rendering"] = [method for name, method in inspect.getmembers(TheWay, inspect.isfunction)
+                                   if name.startswith("draw_")] + [TileRenderer]
+        return subsystems
+
+    def start(self) -> None:
+        if not tracemalloc.is_tracing():
+            tracemalloc.start(self.traceback_depth)
+            self.__started = True
+
+    def stop(self) -> None:
+        if self.__started:
+            tracemalloc.stop()
+            self.__started = False
+
+    def __subsystem(self, traceback: tracemalloc.Traceback) -> str:
+        # Traceback is ordered from the most recent frame
+        for frame in traceback:
+            for first, last, name in self.__ranges.get(frame.filename, ()):
+                if first <= frame.lineno <= last:
+                    return name
+        return "other"
+
+    def __code_subsystem(self, code) -> str | None:
+        """Return the subsystem of the code object (a function, method, comprehension) or None."""
+        for first, last, name in self.__ranges.get(code.co_filename, ()):
+            if first <= code.co_firstlineno <= last:
+                return name
+        return None
+
+    def __profile(self, frame, event: str, arg) -> None:
+        """Profile function (see sys.setprofile()): on every call and return of Python code
+        add the growth of the memory since the previous event to the subsystem running in between.
+        The memory is read before anything is allocated here and the peak is reset after everything
+        allocated here is freed, so the profile function itself is not counted.
+        """
+        if event != "call" and event != "return":
+            return
+        memory = self.__memory
+        memory[0], memory[1] = tracemalloc.get_traced_memory()
+        # memory: current, peak, current after the previous event, current at the start of the frame
+        growth = memory[1] - memory[2]
+        if event == "call":
+            # The frame object of the called code has just been created for the profile function
+            growth -= sys.getsizeof(frame)
+        stack = self.__stack
+        if growth > 0:
+            self.__allocations.add(stack[-1][1], growth)
+        if memory[1] - memory[3] > self.__allocations.peak:
+            self.__allocations.peak = memory[1] - memory[3]
+        del growth
+        code = frame.f_code
+        name = self.__codes.get(code, False)
+        if name is False:
+            name = self.__codes[code] = self.__code_subsystem(code)
+        if name is not None:
+            if event == "call":
+                stack.append((code, name))
+            elif stack[-1][0] is code:
+                stack.pop()
+        # The frame object of the returning code is freed right after, unless it is a generator's frame
+        freed = sys.getsizeof(frame) if event == "return" and not code.co_flags & GENERATOR_FLAGS else 0
+        del code, name, stack, memory
+        self.__memory[2] = tracemalloc.get_traced_memory()[0] - freed
+        del freed
+        tracemalloc.reset_peak()
+
+    @contextmanager
+    def frame(self):
+        """Track allocations of the code inside the with-block as one frame.
+        Yield FrameAllocations object, which is filled when the block ends
+        and appended to self.frames.
+        """
+        self.start()
+        allocations = FrameAllocations()
+        self.__allocations = allocations
+        # The code outside any subsystem: the bottom of the stack of (code object, subsystem)
+        self.__stack = [(None, "other")]
+        before = tracemalloc.take_snapshot()
+        self.__memory[2] = self.__memory[3] = tracemalloc.get_traced_memory()[0]
+        tracemalloc.reset_peak()
+        sys.setprofile(self.__profile)
+        try:
+            yield allocations
+        finally:
+            sys.setprofile(None)
+            # The code after the last call or return
+            current, peak = tracemalloc.get_traced_memory()
+            if peak - self.__memory[2] > 0:
+                allocations.add(self.__stack[-1][1], peak - self.__memory[2])
+            allocations.peak = max(allocations.peak, peak - self.__memory[3])
+            after = tracemalloc.take_snapshot()
+            filters = [tracemalloc.Filter(False, tracemalloc.__file__), tracemalloc.Filter(False, __file__)]
+            for stat in after.filter_traces(filters).compare_to(before.filter_traces(filters), "traceback"):
+                if stat.count_diff > 0:
+                    allocations.add_retained(self.__subsystem(stat.traceback), stat.count_diff, stat.size_diff)
+            self.frames.append(allocations)
+
+    def assert_frame_allocations(self, max_size: int, subsystem: str | None = None,
+                                 frame: FrameAllocations | None = None) -> None:
+        """Raise AssertionError, if the frame (the last tracked one by default) allocated
+        more than max_size bytes in the subsystem (in all subsystems, if None),
+        counting the temporary objects too.
+        """
+        if frame is None:
+            if not self.frames:
+                raise AssertionError("no frames tracked")
+            frame = self.frames[-1]
+        size = frame.total_allocated() if subsystem is None else frame.allocated.get(subsystem, 0)
+        if size > max_size:
+            where = "frame" if subsystem is None else f"subsystem {subsystem!r}"
+            raise AssertionError(f"{where} allocated {size} B, allowed: {max_size}\n{frame}")
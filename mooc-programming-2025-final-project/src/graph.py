@@ -0,0 +1,263 @@
+from __future__ import annotations
+#from typing import Self  # available from Python 3.11
+from heapq import heappush, heappop
+
+
+class JunctionGraph:
+    """
+    JunctionGraph(Maze) -> new JunctionGraph object for the maze (use Maze.junction_graph()).
+
+    JunctionGraph is the maze contracted to its junctions and dead ends:
+    nodes are open cells (not walls) having other than two open neighbours,
+    edges are the corridors between them, with corridor length in cells.
+    In a perfect maze most cells are corridor cells, so pathfinding over the graph
+    touches only a small part of the cells.
+
+    The graph listens to Maze.mark_cell() and is updated locally, when a wall appears
+    or disappears (e.g. robot rams a wall): only the corridors passing through the changed
+    cell and its neighbours are traced again.
+
+    Attributes:
+    nodes (dictionary node -> {neighbour node: corridor length}, node is a cell (x, y)).
+
+    Methods:
+    is_node(cell), corridor(cell), way(start, target), shortest_path(start, goal), next_step(start, goal),
+    rebuild(), close().
+    """
+    def __init__(self, maze) -> None:
+        self.__maze = maze
+        # While the graph is being updated, (cell, is_open) forces the state of the changed cell
+        # as it was before the change.
+        self.__override = None
+        self.nodes = {}
+        self.rebuild()
+        maze.add_listener(self.__on_mark)
+
+    def close(self) -> None:
+        """Stop listening to the maze changes."""
+        self.__maze.remove_listener(self.__on_mark)
+
+    def __is_open(self, cell: tuple) -> bool:
+        if self.__override is not None and cell == self.__override[0]:
+            return self.__override[1]
+        x, y = cell
+        return self.__maze.maze[y][x] not in (self.__maze.wall, self.__maze.unvisited)
+
+    def __open_neighbours(self, cell: tuple) -> list:
+        x, y = cell
+        return [nearest for nearest in ((x+1, y), (x-1, y), (x, y+1), (x, y-1)) if self.__is_open(nearest)]
+
+    def is_node(self, cell: tuple) -> bool:
+        """Return True, if the cell is open and is a junction or a dead end (not a corridor cell)."""
+        return self.__is_open(cell) and len(self.__open_neighbours(cell)) != 2
+
+    def __trace(self, cell: tuple, first: tuple) -> tuple:
+        """Walk from the cell through its open neighbour first along the corridor
+        until a node. Return tuple (node, length).
+        """
+        previous, current, length = cell, first, 1
+        while not self.is_node(current):
+            a, b = self.__open_neighbours(current)
+            previous, current = current, (b if a == previous else a)
+            length += 1
+            if current == cell:
+                # A closed loop without any junction
+                break
+        return current, length
+
+    def __add_edge(self, a: tuple, b: tuple, length: int) -> None:
+        if a == b:
+            return
+        if length < self.nodes[a].get(b, length + 1):
+            self.nodes[a][b] = length
+            self.nodes[b][a] = length
+
+    def __trace_node(self, node: tuple) -> None:
+        """(Re)compute all the edges of the node."""
+        for neighbour in self.nodes[node]:
+            self.nodes[neighbour].pop(node, None)
+        self.nodes[node] = {}
+        for first in self.__open_neighbours(node):
+            end, length = self.__trace(node, first)
+            if end in self.nodes:
+                self.__add_edge(node, end, length)
+
+    def rebuild(self) -> None:
+        """Build the graph from scratch for the whole maze."""
+        self.__override = None
+        maze = self.__maze
+        self.nodes = {(x, y): {} for y in range(1, maze.height-1) for x in range(1, maze.width-1)
+                      if self.is_node((x, y))}
+        for node in self.nodes:
+            for first in self.__open_neighbours(node):
+                end, length = self.__trace(node, first)
+                if end in self.nodes:
+                    self.__add_edge(node, end, length)
+
+    def __on_mark(self, cell: tuple, old_mark: int, mark: int) -> None:
+        closed = (self.__maze.wall, self.__maze.unvisited)
+        was_open = old_mark not in closed
+        if was_open != (mark not in closed):
+            self.__update(cell, was_open)
+
+    def __update(self, cell: tuple, was_open: bool) -> None:
+        """Update the graph after the cell changed from open to closed or back."""
+        x, y = cell
+        local = [cell, (x+1, y), (x-1, y), (x, y+1), (x, y-1)]
+
+        # 1) In the old state of the maze: find the nodes, whose edges may pass through the changed cells
+        self.__override = (cell, was_open)
+        affected = set()
+        for c in local:
+            if not self.__is_open(c):
+                continue
+            if c in self.nodes:
+                affected.add(c)
+            else:
+                for first in self.__open_neighbours(c):
+                    affected.add(self.__trace(c, first)[0])
+        self.__override = None
+
+        # 2) Remove the affected nodes, remember their former neighbours
+        former = set()
+        for node in affected:
+            for neighbour in self.nodes.pop(node, {}):
+                former.add(neighbour)
+                if neighbour in self.nodes:
+                    self.nodes[neighbour].pop(node, None)
+
+        # 3) In the new state: add back the nodes and trace their corridors again
+        retrace = [c for c in affected.union(local) if self.is_node(c)]
+        for node in retrace:
+            self.nodes.setdefault(node, {})
+        retrace += [node for node in former if node in self.nodes and node not in affected]
+        for node in retrace:
+            self.__trace_node(node)
+
+    def corridor(self, cell: tuple) -> list:
+        """Return the cells of the corridor containing the open cell, from one end node
+        to the other (both included). For a node, return [node].
+        """
+        if self.is_node(cell):
+            return [cell]
+        halves = []
+        for first in self.__open_neighbours(cell):
+            half = []
+            previous, current = cell, first
+            while current != cell:
+                half.append(current)
+                if self.is_node(current):
+                    break
+                a, b = self.__open_neighbours(current)
+                previous, current = current, (b if a == previous else a)
+            halves.append(half)
+        return halves[0][::-1] + [cell] + halves[1]
+
+    def __attach(self, cell: tuple) -> dict:
+        """Return {node: distance} of the nodes, where the cell is connected to (itself, if node).
+        A cell on a closed loop without any junction is connected to no nodes.
+        """
+        if cell in self.nodes:
+            return {cell: 0}
+        ends = {}
+        for first in self.__open_neighbours(cell):
+            end, length = self.__trace(cell, first)
+            if end in self.nodes and length < ends.get(end, length + 1):
+                ends[end] = length
+        return ends
+
+    def shortest_path(self, start: tuple, goal: tuple) -> tuple | None:
+        """Find the shortest way between the open cells start and goal.
+        Return tuple (length in cells, list of nodes on the way including start and goal)
+        or None, if goal can not be reached.
+        """
+        if not self.__is_open(start) or not self.__is_open(goal):
+            return None
+        if start == goal:
+            return 0, [start]
+        # Start and goal in the same corridor
+        direct = None
+        if start not in self.nodes:
+            cells = self.corridor(start)
+            if goal in cells:
+                # On a closed loop without any junction goal is in both halves: take the nearer one
+                middle = cells.index(start)
+                direct = min(abs(i - middle) for i, cell in enumerate(cells) if cell == goal)
+
+        goal_ends = self.__attach(goal)
+        distances = {}
+        previous = {}
+        queue = []
+        for node, length in self.__attach(start).items():
+            distances[node] = length
+            if node != start:
+                previous[node] = start
+            heappush(queue, (length, node))
+        best = (direct, None) if direct is not None else None
+        done = set()
+        while queue:
+            distance, node = heappop(queue)
+            if node in done:
+                continue
+            done.add(node)
+            if best is not None and distance >= best[0]:
+                break
+            if node in goal_ends:
+                total = distance + goal_ends[node]
+                if best is None or total < best[0]:
+                    best = (total, node)
+            for neighbour, length in self.nodes[node].items():
+                new_distance = distance + length
+                if new_distance < distances.get(neighbour, new_distance + 1):
+                    distances[neighbour] = new_distance
+                    previous[neighbour] = node
+                    heappush(queue, (new_distance, neighbour))
+        if best is None:
+            return None
+        length, node = best
+        if node is None:
+            return length, [start, goal]
+        path = [goal] if node != goal else []
+        while node != start:
+            path.append(node)
+            node = previous[node]
+        path.append(start)
+        return length, path[::-1]
+
+    def next_step(self, start: tuple, goal: tuple) -> tuple | None:
+        """Return the neighbour cell of start, which is the first step of the shortest way
+        to goal, or None if there is no way (or start is goal).
+        """
+        found = self.shortest_path(start, goal)
+        if found is None or found[0] == 0:
+            return None
+        # The way to the next cell of the path goes along one corridor of start:
+        # take the shortest of the corridors leading there
+        cells = self.way(start, found[1][1])
+        return None if cells is None else cells[0]
+
+    def way(self, start: tuple, target: tuple) -> list | None:
+        """Return the cells of the shortest way from start to target along one corridor of start
+        (start not included, target included), e.g. from a node to its neighbour node in self.nodes.
+        Return None, if no corridor of start leads to target.
+        """
+        best = None
+        for first in self.__open_neighbours(start):
+            cells = self.__walk(start, first, target)
+            if cells is not None and (best is None or len(cells) < len(best)):
+                best = cells
+        return best
+
+    def __walk(self, cell: tuple, first: tuple, target: tuple) -> list | None:
+        """Walk from the cell through its open neighbour first along the corridor.
+        Return the cells on the way to target or None, if a node (or the cell again) comes first.
+        """
+        previous, current = cell, first
+        cells = [first]
+        while current != target:
+            if current == cell or self.is_node(current):
+                return None
+            a, b = self.__open_neighbours(current)
+            previous, current = current, (b if a == previous else a)
+            cells.append(current)
+        return cells
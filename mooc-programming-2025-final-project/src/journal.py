@@ -0,0 +1,352 @@
+from __future__ import annotations
+#from typing import Self  # available from Python 3.11
+import os
+import struct
+import threading
+import zlib
+from collections import deque
+from maze import Maze
+
+
+# The journal file starts with MAGIC, then records follow:
+# RECORD_HEADER (kind, payload length), payload, RECORD_CRC (crc32 of the header and the payload).
+# (version 2: robot coordinates are integers, version 1 journals are not read)
+MAGIC = b"TWJ2"
+RECORD_HEADER = struct.Struct("<BI")
+RECORD_CRC = struct.Struct("<I")
+
+# Kinds of the records
+MARK = 1        # mark_cell(): x, y, mark
+ROBOT = 2       # robot moved or counters changed: x, y, rams, coins
+MONSTER = 3     # monster moved: index, x, y, amount of overlapped cells, then x, y, mark of each
+LEVEL = 4       # new level started: level, monsters, rams, coins, seed
+CHECKPOINT = 5  # the whole game state (GameState.pack()), compressed with zlib
+
+MARK_RECORD = struct.Struct("<HHB")
+ROBOT_RECORD = struct.Struct("<HHII")
+MONSTER_RECORD = struct.Struct("<HHHH")
+OVERLAPPED_RECORD = struct.Struct("<HHB")
+LEVEL_RECORD = struct.Struct("<IIIIQ")
+
+# Checkpoint: level (as LEVEL_RECORD), levels amount (0 for endless), levels master seed, zoom, width, height
+STATE_HEADER = struct.Struct("<IIIIQIQfHH")
+COUNT = struct.Struct("<H")
+CELL = struct.Struct("<HH")
+
+
+class GameState:
+    """
+    GameState(level, width, height) -> new GameState object of the level with the empty maze.
+
+    GameState is the state of the game which is saved into the journal at checkpoints:
+    enough to continue the game (and to restart the level) after the program is started again.
+
+    Attributes:
+    level (dictionary, see levels.Levels), levels (tuple (amount or None, master seed)), zoom,
+    width, height, maze (bytearray of the marks, see Maze.snapshot()),
+    initial (tuple (maze snapshot, hidden doors, monster cells) at the start of the level),
+    hidden_doors (list of cells hidden at the checkpoint: the doors put into the maze since then
+    are found in the maze or overlapped by monsters), robot (tuple (x, y, rams, coins)),
+    monsters (list of tuples (x, y, overlapped dictionary)).
+
+    Methods:
+    pack(), unpack(data) (class method), apply(kind, payload), new_maze().
+    """
+    def __init__(self, level: dict, width: int, height: int) -> None:
+        self.level = dict(level)
+        self.levels = (None, 0)
+        self.zoom = 1.0
+        self.width = width
+        self.height = height
+        self.maze = bytearray(width * height)
+        self.initial = (bytes(width * height), [], [])
+        self.hidden_doors = []
+        self.robot = (0, 0, 0, 0)
+        self.monsters = []
+
+    @staticmethod
+    def __pack_cells(cells: list) -> bytes:
+        return COUNT.pack(len(cells)) + b''.join(CELL.pack(x, y) for x, y in cells)
+
+    @staticmethod
+    def __unpack_cells(data: bytes, offset: int) -> tuple:
+        """Return tuple (list of cells, offset after them)."""
+        count, = COUNT.unpack_from(data, offset)
+        offset += COUNT.size
+        cells = [CELL.unpack_from(data, offset + i*CELL.size) for i in range(count)]
+        return cells, offset + count*CELL.size
+
+    def pack(self) -> bytes:
+        """Return the state as bytes (see unpack())."""
+        level = self.level
+        amount, levels_seed = self.levels
+        parts = [STATE_HEADER.pack(level["level"], level["monsters"], level["rams"], level["coins"], level["seed"],
+                                   amount or 0, levels_seed, self.zoom, self.width, self.height),
+                 self.initial[0], bytes(self.maze),
+                 self.__pack_cells(self.initial[1]), self.__pack_cells(self.initial[2]),
+                 self.__pack_cells(self.hidden_doors),
+                 ROBOT_RECORD.pack(*self.robot), COUNT.pack(len(self.monsters))]
+        for index, (x, y, overlapped) in enumerate(self.monsters):
+            parts.append(pack_monster(index, x, y, overlapped))
+        return b''.join(parts)
+
+    @classmethod
+    def unpack(cls, data: bytes) -> GameState:
+        """Create GameState object from the bytes returned by pack()."""
+        level, monsters, rams, coins, seed, amount, levels_seed, zoom, width, height = \
+            STATE_HEADER.unpack_from(data)
+        state = cls({"level": level, "monsters": monsters, "rams": rams, "coins": coins, "seed": seed},
+                    width, height)
+        state.levels = (amount or None, levels_seed)
+        state.zoom = zoom
+        offset = STATE_HEADER.size
+        size = width * height
+        initial_maze = bytes(data[offset:offset + size])
+        state.maze[:] = data[offset + size:offset + 2*size]
+        offset += 2*size
+        initial_doors, offset = cls.__unpack_cells(data, offset)
+        initial_monsters, offset = cls.__unpack_cells(data, offset)
+        state.initial = (initial_maze, initial_doors, initial_monsters)
+        state.hidden_doors, offset = cls.__unpack_cells(data, offset)
+        state.robot = ROBOT_RECORD.unpack_from(data, offset)
+        offset += ROBOT_RECORD.size
+        count, = COUNT.unpack_from(data, offset)
+        offset += COUNT.size
+        for _ in range(count):
+            index, x, y, overlapped, offset = unpack_monster(data, offset)
+            state.monsters.append((x, y, overlapped))
+        return state
+
+    def apply(self, kind: int, payload: bytes) -> None:
+        """Apply the journal record (written after the checkpoint) to the state."""
+        if kind == MARK:
+            x, y, mark = MARK_RECORD.unpack(payload)
+            self.maze[y*self.width + x] = mark
+        elif kind == ROBOT:
+            self.robot = ROBOT_RECORD.unpack(payload)
+        elif kind == MONSTER:
+            index, x, y, overlapped, _ = unpack_monster(payload, 0)
+            if index < len(self.monsters):
+                self.monsters[index] = (x, y, overlapped)
+        # LEVEL records are always followed by a checkpoint of the new level,
+        # until it is written, the state of the previous level is the saved one.
+
+    def new_maze(self) -> Maze:
+        """Return the Maze object of the level in the saved state
+        (start_cell and finish_cell are those of the level's start).
+        """
+        maze = Maze.from_snapshot(self.width, self.height, self.initial[0])
+        maze.restore(bytes(self.maze))
+        return maze
+
+
+def pack_monster(index: int, x: int, y: int, overlapped: dict) -> bytes:
+    """Return MONSTER record payload."""
+    return MONSTER_RECORD.pack(index, x, y, len(overlapped)) + \
+        b''.join(OVERLAPPED_RECORD.pack(cx, cy, mark) for (cx, cy), mark in overlapped.items())
+
+
+def unpack_monster(data: bytes, offset: int) -> tuple:
+    """Return tuple (index, x, y, overlapped dictionary, offset after the record) from MONSTER payload."""
+    index, x, y, count = MONSTER_RECORD.unpack_from(data, offset)
+    offset += MONSTER_RECORD.size
+    overlapped = {}
+    for _ in range(count):
+        cx, cy, mark = OVERLAPPED_RECORD.unpack_from(data, offset)
+        overlapped[(cx, cy)] = mark
+        offset += OVERLAPPED_RECORD.size
+    return index, x, y, overlapped, offset
+
+
+def read_records(data: bytes):
+    """Generate (kind, payload) of the records in the journal data.
+    Stop at the first incomplete or damaged record (e.g. written when the program crashed).
+    """
+    if data[:len(MAGIC)] != MAGIC:
+        return
+    view = memoryview(data)
+    offset = len(MAGIC)
+    while offset + RECORD_HEADER.size + RECORD_CRC.size <= len(data):
+        kind, length = RECORD_HEADER.unpack_from(data, offset)
+        end = offset + RECORD_HEADER.size + length
+        if end + RECORD_CRC.size > len(data):
+            return
+        crc, = RECORD_CRC.unpack_from(data, end)
+        if zlib.crc32(view[offset:end]) != crc:
+            return
+        yield kind, view[offset + RECORD_HEADER.size:end]
+        offset = end + RECORD_CRC.size
+
+
+def valid_length(data: bytes) -> int:
+    """Return the length of the journal data up to the end of the last valid record
+    (0, if the data does not start with MAGIC).
+    """
+    if data[:len(MAGIC)] != MAGIC:
+        return 0
+    return len(MAGIC) + sum(RECORD_HEADER.size + len(payload) + RECORD_CRC.size for _, payload in read_records(data))
+
+
+def read_journal(path: str) -> GameState | None:
+    """Read the journal file: load the latest checkpoint and apply the records written after it.
+    Return GameState object or None, if there is no file or no checkpoint in it.
+    """
+    try:
+        with open(path, "rb") as file:
+            data = file.read()
+    except FileNotFoundError:
+        return None
+    state = None
+    for kind, payload in read_records(data):
+        if kind == CHECKPOINT:
+            state = GameState.unpack(zlib.decompress(payload))
+        elif state is not None:
+            state.apply(kind, payload)
+    return state
+
+
+class Journal:
+    """
+    Journal(path) -> new Journal object writing into the new (emptied) file path.
+    Journal(path, append=True) -> the same appending to the existing file (e.g. after read_journal()).
+
+    Journal is the append-only binary log of the game: every change of the state is a small record
+    (Maze.mark_cell() calls of the attached maze, robot and monster moves, level starts),
+    with checkpoints of the whole GameState written now and then. The game is resumed from
+    the latest checkpoint by applying the records written after it (see read_journal()).
+
+    Recording only appends the records to the list in memory; a background thread writes them
+    to the file every flush_interval seconds (and flushes them to the disk), so a crash loses
+    at most the changes of the last flush_interval. When the file grows over compact_size,
+    it is replaced with a new one starting with the latest checkpoint.
+
+    Methods:
+    attach(maze), detach(), record_level(level), record_robot(robot), record_monsters(monsters),
+    checkpoint(state), checkpoint_due(), close().
+    """
+    def __init__(self, path: str, append: bool = False, flush_interval: float = 0.5,
+                 checkpoint_records: int = 5000, compact_size: int = 1 << 20) -> None:
+        self.path = path
+        self.flush_interval = flush_interval
+        self.checkpoint_records = checkpoint_records
+        self.compact_size = compact_size
+        self.__file = open(path, "r+b" if append and os.path.exists(path) else "w+b")
+        # Records after a damaged one would never be read: continue after the last valid record
+        self.__file.truncate(valid_length(self.__file.read()))
+        self.__file.seek(0, os.SEEK_END)
+        if self.__file.tell() == 0:
+            self.__file.write(MAGIC)
+        # Records (kind, payload) not written yet: appended by the game, taken by the writer thread
+        self.__pending = deque()
+        self.__records_since_checkpoint = 0
+        self.__maze = None
+        self.__robot = None
+        self.__monsters = []
+        self.__closed = False
+        self.__wakeup = threading.Condition()
+        self.__writer = threading.Thread(target=self.__write_loop, name="journal", daemon=True)
+        self.__writer.start()
+
+    def __append(self, kind: int, payload: bytes) -> None:
+        self.__pending.append((kind, payload))
+        self.__records_since_checkpoint += 1
+
+    def attach(self, maze: Maze) -> None:
+        """Record all mark_cell() calls of the maze (the previously attached maze is detached)."""
+        self.detach()
+        self.__maze = maze
+        maze.add_listener(self.__on_mark)
+
+    def detach(self) -> None:
+        """Stop recording the changes of the attached maze."""
+        if self.__maze is not None:
+            self.__maze.remove_listener(self.__on_mark)
+            self.__maze = None
+
+    def __on_mark(self, cell: tuple, old_mark: int, mark: int) -> None:
+        self.__append(MARK, MARK_RECORD.pack(cell[0], cell[1], mark))
+
+    def record_level(self, level: dict) -> None:
+        """Record the start of the level (the checkpoint of the new level is expected to follow)."""
+        self.__append(LEVEL, LEVEL_RECORD.pack(level["level"], level["monsters"], level["rams"],
+                                               level["coins"], level["seed"]))
+
+    def record_robot(self, robot) -> None:
+        """Record the position, rams and coins of the robot, if they changed since the last record."""
+        state = (robot.cell[0], robot.cell[1], robot.rams, robot.coins)
+        if state != self.__robot:
+            self.__robot = state
+            self.__append(ROBOT, ROBOT_RECORD.pack(*state))
+
+    def record_monsters(self, monsters: list) -> None:
+        """Record the position and the overlapped cells of the monsters, which changed since the last record."""
+        if len(self.__monsters) != len(monsters):
+            self.__monsters = [None] * len(monsters)
+        for index, monster in enumerate(monsters):
+            state = (monster.cell, tuple(monster.overlapped.items()))
+            if state != self.__monsters[index]:
+                self.__monsters[index] = state
+                x, y = monster.cell
+                self.__append(MONSTER, pack_monster(index, x, y, monster.overlapped))
+
+    def checkpoint(self, state: GameState) -> None:
+        """Record the whole state of the game."""
+        self.__robot = state.robot
+        self.__monsters = [((x, y), tuple(overlapped.items())) for x, y, overlapped in state.monsters]
+        # Compressed by the writer thread
+        self.__append(CHECKPOINT, state.pack())
+        self.__records_since_checkpoint = 0
+        with self.__wakeup:
+            self.__wakeup.notify()
+
+    def checkpoint_due(self) -> bool:
+        """Return True, if checkpoint_records records have been written since the last checkpoint."""
+        return self.__records_since_checkpoint >= self.checkpoint_records
+
+    def __write_loop(self) -> None:
+        while True:
+            with self.__wakeup:
+                if not self.__closed:
+                    self.__wakeup.wait(self.flush_interval)
+                closed = self.__closed
+            self.__write_pending()
+            if closed:
+                return
+
+    def __write_pending(self) -> None:
+        pending = self.__pending
+        if not pending:
+            return
+        while pending:
+            kind, payload = pending.popleft()
+            if kind == CHECKPOINT:
+                payload = zlib.compress(payload)
+            record = RECORD_HEADER.pack(kind, len(payload)) + payload
+            record += RECORD_CRC.pack(zlib.crc32(record))
+            if kind == CHECKPOINT and self.__file.tell() > self.compact_size:
+                self.__compact(record)
+            else:
+                self.__file.write(record)
+        self.__file.flush()
+        os.fsync(self.__file.fileno())
+
+    def __compact(self, checkpoint: bytes) -> None:
+        """Replace the file with the new one starting with the checkpoint record.
+        The new file is written next to the old one and replaces it atomically.
+        """
+        with open(self.path + ".tmp", "wb") as file:
+            file.write(MAGIC + checkpoint)
+            file.flush()
+            os.fsync(file.fileno())
+        self.__file.close()
+        os.replace(self.path + ".tmp", self.path)
+        self.__file = open(self.path, "ab")
+
+    def close(self) -> None:
+        """Write all the records to the file, stop the writer thread, stop recording the maze."""
+        self.detach()
+        with self.__wakeup:
+            self.__closed = True
+            self.__wakeup.notify()
+        self.__writer.join()
+        self.__file.close()
@@ -1,34 +1,59 @@
 from __future__ import annotations
 #from typing import Self  # available from Python 3.11
+from random import getrandbits
 
 
+MASK64 = (1 << 64) - 1
+
+
+def mix_seed(seed: int, n: int) -> int:
+    """Derive a 64-bit seed for the n-th item from the master seed (splitmix64 step)."""
+    z = (seed + n * 0x9E3779B97F4A7C15) & MASK64
+    z = ((z ^ (z >> 30)) * 0xBF58476D1CE4E5B9) & MASK64
+    z = ((z ^ (z >> 27)) * 0x94D049BB133111EB) & MASK64
+    return z ^ (z >> 31)
+
 
 class Levels:
     """
     Levels() -> new Levels object with one level.
     Levels(amount=N) -> new Levels object with N levels.
+    Levels(amount=None) -> new endless Levels object.
+    Levels(amount=N, seed=S) -> new Levels object with N levels derived from the master seed S.
 
-    Level in levels is presented as dictionary with descriptive keys and values.
-    Levels object is iterable.
+    Level in levels is presented as dictionary with descriptive keys and values,
+    including "seed" for the level's maze.
+    Levels are not stored: any level is computed directly from its number and the master seed,
+    so levels[n] (levels are numbered from 1) takes the same time for any n.
+    Levels object is iterable (lazily, from level 1).
     """
-    def __init__(self, amount: int=1) -> None:
-        if amount >= 1:
+    def __init__(self, amount: int | None = 1, seed: int | None = None) -> None:
+        if amount is None or amount >= 1:
             self.amount = amount
         else:
             self.amount = 1
-        self.generate_levels()
-    
-    def generate_levels(self) -> None:
-        self.levels = [{"level": n, "monsters": n, "rams": n+1, "coins": n*10} for n in range(1, self.amount+1)]
-
-    def __iter__(self) -> Levels:
-        self.n = 0
-        return self
-    
-    def __next__(self) -> dict:
-        if self.n < self.amount:
-            level = self.levels[self.n]
-            self.n += 1
-            return level
-        else:
-            raise StopIteration
\ No newline at end of file
+        if seed is None:
+            seed = getrandbits(64)
+        # Any integer is accepted (e.g. negative): only its lowest 64 bits are used by mix_seed(),
+        # so the levels stay the same, and the seed can be saved as unsigned 64-bit (see journal.py)
+        self.seed = seed & MASK64
+
+    def level(self, n: int) -> dict:
+        """Return the level number n (1 <= n <= amount) or raise IndexError."""
+        if n < 1 or (self.amount is not None and n > self.amount):
+            raise IndexError(f"level number out of range: {n}")
+        return {"level": n, "monsters": n, "rams": n+1, "coins": n*10, "seed": mix_seed(self.seed, n)}
+
+    def __getitem__(self, n: int) -> dict:
+        return self.level(n)
+
+    def __len__(self) -> int:
+        if self.amount is None:
+            raise TypeError("endless Levels object has no length")
+        return self.amount
+
+    def __iter__(self):
+        n = 1
+        while self.amount is None or n <= self.amount:
+            yield self.level(n)
+            n += 1
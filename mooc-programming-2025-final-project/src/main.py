@@ -1,9 +1,26 @@
+import argparse
 from the_way import TheWay
+from atlas import ZOOMS
 
 
 def main():
-    TheWay(5)
+    parser = argparse.ArgumentParser(description="The Way: find the exit in the maze")
+    parser.add_argument("--levels", type=int, default=5, help="amount of levels, 0 for endless game")
+    parser.add_argument("--start", type=int, default=1, help="number of the level to start from")
+    parser.add_argument("--seed", type=int, default=None, help="master seed of the levels")
+    parser.add_argument("--fog", action="store_true", help="show only what robot can see")
+    parser.add_argument("--track-allocations", action="store_true", help="report allocations per frame")
+    parser.add_argument("--zoom", type=float, default=1, choices=ZOOMS, help="zoom level of the images")
+    parser.add_argument("--journal", default=None, help="file where the game is saved continuously")
+    parser.add_argument("--resume", action="store_true", help="continue the game saved in the journal file")
+    parser.add_argument("--telemetry", default=None, help="SQLite file where gameplay metrics are recorded")
+    parser.add_argument("--fps", type=int, default=60, help="frame rate limit, 0 for no limit")
+    args = parser.parse_args()
+    TheWay(args.levels or None, start_level=args.start, seed=args.seed, fog_of_war=args.fog,
+           track_allocations=args.track_allocations, zoom=args.zoom,
+           journal_path=args.journal, resume=args.resume, telemetry_path=args.telemetry,
+           frame_rate=args.fps)
 
 
 if __name__ == "__main__":
-    main()
\ No newline at end of file
+    main()
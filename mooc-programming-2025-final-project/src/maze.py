@@ -1,11 +1,36 @@
 from __future__ import annotations
 #from typing import Self  # available from Python 3.11
-from random import choice
+from collections import deque
+from operator import index
+from random import Random
+import struct
+import zlib
+from graph import JunctionGraph
+
+
+# Text form of the maze: one digit (mark value) per cell, one line per row.
+TO_TEXT = bytes.maketrans(bytes(range(10)), b'0123456789')
+FROM_TEXT = bytes.maketrans(b'0123456789', bytes(range(10)))
+
+# Colors of marks in exported images (mark name -> (red, green, blue))
+COLORS = {
+    'unvisited': (0, 0, 0),
+    'wall': (100, 30, 30),
+    'path': (102, 102, 102),
+    'coin': (255, 215, 0),
+    'door': (0, 200, 0),
+    'monster': (160, 32, 240),
+    'robot': (0, 120, 255),
+}
 
 
 class Maze:
     """
     Maze(width, height) -> new Maze object containing the height-by-width matrix.
+    Maze(width, height, seed=S) -> the same, generated reproducibly from seed S.
+    Maze.from_text(text), Maze.from_file(file) -> Maze object loaded from the text form (see __str__).
+    Maze.from_snapshot(width, height, snapshot) -> Maze object with the marks from snapshot().
+    Maze.attach(shared) -> Maze object using the grid shared by another process (see share()).
     
     Maze is a randomly structured labyrinth containing paths and walls, 
     outer walls are obligatory.
@@ -21,34 +46,194 @@ class Maze:
     marks can be accessed by name as properties of the Maze object.
 
     Public methods:
-    pick_random_cell(mark), get_nearest(cell), is_outer_wall(cell), 
+    pick_random_cell(mark), place_randomly(mark, amount), populate(robots, doors, monsters, coins),
+    hide_doors(), unhide_doors(hidden_doors), get_nearest(cell), is_outer_wall(cell), 
     is_dead_end(cell), find_cells_by_mark(mark), dead_ends(), 
     mark_cell(cell, mark), check_mark(cell, mark), get_mark(cell),
+    add_listener(callback), remove_listener(callback), snapshot(), restore(snapshot),
+    write_text(file), write_ppm(file), write_png(file), junction_graph(), share(), unshare(), detach(),
     (cell is a tuple of coordinates (x, y) in maze matrix).
 
     Maze object is iterable, returning mark and coordinates (x, y) of a cell.
     Optional argument walls_factor increases amount of walls inside labyrinth.
     Width and height are expected to be odd numbers, if not, 1 is subtracted from the even one.
     """
-    def __init__(self, width: int, height: int, walls_factor=0) -> None:
+    def __init__(self, width: int, height: int, walls_factor=0, seed=None) -> None:
         # Check width and height are not equal numbers, else subtract 1.
         if width%2 == 0:
             width -= 1
         if height%2 == 0:
             height -= 1
-        self.width = width
-        self.height = height
-
         if walls_factor > 1 or walls_factor < 0:
             raise ValueError(f"walls_factor must be 0 <= float <= 1, given: {walls_factor}")
-        self.walls_factor = walls_factor
         
-        self.__set_marks()
+        self.__setup(width, height, walls_factor, seed)
         self.__generate_maze_blueprint()
         self.__add_more_walls()
         self.start_cell = self.pick_random_cell(self.unvisited)
         self.finish_cell = None
         self.__track_maze(self.start_cell)
+        self.__connect_regions()
+        # Nothing was tracked from the start cell (it was enclosed by the additional walls)
+        if self.finish_cell is None:
+            self.finish_cell = self.__farthest_cell(self.start_cell)
+
+    def __setup(self, width: int, height: int, walls_factor=0, seed=None) -> None:
+        """Set the attributes common for generated and loaded mazes."""
+        self.width = width
+        self.height = height
+        self.walls_factor = walls_factor
+        self.__listeners = []
+        self.__graph = None
+        # Shared memory segment of the grid (see share() and attach())
+        self.__segment = None
+        self.__segment_view = None
+        self.__segment_owner = False
+        self.__copy_on_write = False
+        self.__random = Random(seed)
+        self.__set_marks()
+
+    @classmethod
+    def from_text(cls, text: str) -> Maze:
+        """Create Maze object from its text form (see __str__())."""
+        return cls.from_file(text.splitlines())
+
+    @classmethod
+    def from_file(cls, file) -> Maze:
+        """Create Maze object from the text form (see __str__()) read line by line 
+        from file (a path or an iterable of lines, e.g. file object).
+        start_cell is the first cell with robot, finish_cell the first cell with door (or None).
+        """
+        if isinstance(file, str):
+            with open(file) as f:
+                return cls.from_file(f)
+        rows = []
+        for line in file:
+            line = line.rstrip('\r\n')
+            if not line:
+                continue
+            if not line.isdigit() or max(line) > '6':
+                raise ValueError(f"row {len(rows)} contains unknown marks: {line!r}")
+            if rows and len(line) != len(rows[0]):
+                raise ValueError(f"row {len(rows)} has length {len(line)}, expected: {len(rows[0])}")
+            rows.append(list(line.encode('ascii').translate(FROM_TEXT)))
+        if not rows:
+            raise ValueError("maze text is empty")
+
+        maze = cls.__new__(cls)
+        maze.__setup(len(rows[0]), len(rows))
+        maze.maze = rows
+        maze.start_cell = maze.__find_first(maze.robot)
+        maze.finish_cell = maze.__find_first(maze.door)
+        return maze
+
+    @classmethod
+    def from_snapshot(cls, width: int, height: int, snapshot: bytes) -> Maze:
+        """Create Maze object with the given dimensions from the snapshot (see snapshot()).
+        start_cell is the first cell with robot, finish_cell the first cell with door (or None).
+        """
+        if len(snapshot) != width * height:
+            raise ValueError(f"snapshot must have {width * height} bytes, given: {len(snapshot)}")
+        maze = cls.__new__(cls)
+        maze.__setup(width, height)
+        maze.maze = [list(snapshot[y*width:(y+1)*width]) for y in range(height)]
+        maze.start_cell = maze.__find_first(maze.robot)
+        maze.finish_cell = maze.__find_first(maze.door)
+        return maze
+
+    @classmethod
+    def attach(cls, shared: SharedMaze, copy_on_write: bool = False) -> Maze:
+        """Create Maze object using the grid placed into shared memory by another process
+        (shared is the handle returned by share()). Rows of the grid are read directly
+        from the shared memory, so attaching costs the same for any size of the maze.
+        The grid is read-only: mark_cell() raises TypeError, or, if copy_on_write,
+        the row is copied into the own memory of the maze when it is changed first
+        (the changes are not seen by other processes).
+        """
+        from shared_maze import attach_segment
+        maze = cls.__new__(cls)
+        maze.__setup(shared.width, shared.height)
+        maze.maze = []
+        maze.start_cell = shared.start_cell
+        maze.finish_cell = shared.finish_cell
+        maze.__use_segment(attach_segment(shared.name), writable=False)
+        maze.__copy_on_write = copy_on_write
+        return maze
+
+    def share(self) -> SharedMaze:
+        """Place the grid into a new shared memory segment, the maze keeps using it from there.
+        Return the handle (see shared_maze.SharedMaze): sent to worker processes,
+        it is used to attach the maze there (see attach()). Closing the handle
+        (or unshare()) moves the grid back and removes the segment.
+        """
+        from shared_maze import SharedMaze, create_segment
+        if self.__segment is not None:
+            raise ValueError(f"maze is already in shared memory: {self.__segment.name}")
+        segment = create_segment(self.width * self.height)
+        segment.buf[:self.width * self.height] = self.snapshot()
+        self.__use_segment(segment, writable=True)
+        self.__segment_owner = True
+        return SharedMaze(segment.name, self.width, self.height, self.start_cell, self.finish_cell, self)
+
+    def __use_segment(self, segment, writable: bool) -> None:
+        """Replace the rows of the grid with the views of the segment."""
+        view = segment.buf if writable else segment.buf.toreadonly()
+        self.maze[:] = [view[y*self.width:(y+1)*self.width] for y in range(self.height)]
+        self.__segment = segment
+        self.__segment_view = view
+
+    def unshare(self) -> None:
+        """Move the grid from shared memory back into the own memory of the maze and close the segment
+        (remove it, if the grid was shared by this maze). Do nothing, if the grid is not shared.
+        An attached maze, which is not used any more, is released faster by detach().
+        """
+        if self.__segment is None:
+            return
+        for y, row in enumerate(self.maze):
+            if isinstance(row, memoryview):
+                self.maze[y] = list(row)
+                row.release()
+        # All the views must be released, before the segment can be closed
+        if self.__segment_view is not self.__segment.buf:
+            self.__segment_view.release()
+        self.__segment.close()
+        if self.__segment_owner:
+            self.__segment.unlink()
+        self.__segment = None
+        self.__segment_view = None
+        self.__segment_owner = False
+
+    def detach(self) -> None:
+        """Release the grid attached from shared memory (see attach()) without copying it:
+        the maze has no grid afterwards. Do nothing, if the grid is not shared.
+        The maze which shared the grid moves it back with unshare() instead.
+        """
+        if self.__segment is None:
+            return
+        if self.__segment_owner:
+            raise ValueError("the grid is shared by this maze: use unshare()")
+        for row in self.maze:
+            if isinstance(row, memoryview):
+                row.release()
+        self.maze = []
+        self.__segment_view.release()
+        self.__segment.close()
+        self.__segment = None
+        self.__segment_view = None
+
+    def __own_row(self, y: int) -> list:
+        """Copy the row y of the shared grid into the own memory of the maze (copy on write)."""
+        row = self.maze[y]
+        self.maze[y] = list(row)
+        row.release()
+        return self.maze[y]
+
+    def __find_first(self, mark: int) -> tuple | None:
+        """Return coordinates (x, y) of the first cell containing mark, or None."""
+        for y, row in enumerate(self.maze):
+            if mark in row:
+                return row.index(mark), y
+        return None
 
     @property
     def unvisited(self) -> int:
@@ -79,11 +264,63 @@ class Maze:
         return self.marks['robot']
         
     def __str__(self) -> str:
-        result = ''
+        return ''.join(bytes(row).translate(TO_TEXT).decode('ascii') + '\n' for row in self.maze)
+
+    def write_text(self, file) -> None:
+        """Write the text form of the maze (see __str__()) into the text file object, row by row."""
+        for row in self.maze:
+            file.write(bytes(row).translate(TO_TEXT).decode('ascii') + '\n')
+
+    def __channel_tables(self) -> list:
+        """Return translation tables mark -> red, mark -> green, mark -> blue (see COLORS)."""
+        tables = [bytearray(256) for _ in range(3)]
+        for name, mark in self.marks.items():
+            for channel in range(3):
+                tables[channel][mark] = COLORS[name][channel]
+        return [bytes(table) for table in tables]
+
+    def write_ppm(self, file) -> None:
+        """Write the maze as binary PPM image (one pixel per cell, colors from COLORS)
+        into the binary file object, row by row.
+        """
+        red, green, blue = self.__channel_tables()
+        file.write(f"P6\n{self.width} {self.height}\n255\n".encode('ascii'))
+        pixels = bytearray(self.width * 3)
         for row in self.maze:
-            strings = [str(c) for c in row]
-            result += ''.join(strings) + '\n'
-        return result
+            marks = bytes(row)
+            pixels[0::3] = marks.translate(red)
+            pixels[1::3] = marks.translate(green)
+            pixels[2::3] = marks.translate(blue)
+            file.write(pixels)
+
+    def write_png(self, file, chunk_size: int = 1 << 16) -> None:
+        """Write the maze as PNG image (one pixel per cell, colors from COLORS)
+        into the binary file object. Marks are used directly as palette indexes,
+        rows are compressed and written as they go, in IDAT chunks of about chunk_size bytes.
+        """
+        def write_chunk(kind: bytes, data: bytes) -> None:
+            file.write(struct.pack('>I', len(data)) + kind + data)
+            file.write(struct.pack('>I', zlib.crc32(data, zlib.crc32(kind))))
+
+        file.write(b'\x89PNG\r\n\x1a\n')
+        # Width, height, bit depth 8, color type 3 (palette), default compression, filter, no interlace
+        write_chunk(b'IHDR', struct.pack('>IIBBBBB', self.width, self.height, 8, 3, 0, 0, 0))
+        palette = bytearray(3 * len(self.marks))
+        for name, mark in self.marks.items():
+            palette[3*mark:3*mark+3] = bytes(COLORS[name])
+        write_chunk(b'PLTE', bytes(palette))
+
+        compressor = zlib.compressobj()
+        buffer = bytearray()
+        for row in self.maze:
+            # Every row starts with filter type 0 (none)
+            buffer += compressor.compress(b'\x00' + bytes(row))
+            if len(buffer) >= chunk_size:
+                write_chunk(b'IDAT', bytes(buffer))
+                buffer.clear()
+        buffer += compressor.flush()
+        write_chunk(b'IDAT', bytes(buffer))
+        write_chunk(b'IEND', b'')
     
     def __iter__(self) -> Maze:
         self.__n = 0
@@ -128,16 +365,17 @@ class Maze:
     def __add_more_walls(self) -> None:
         """Add additional walls instead of unvisited cells into the maze, placed randomly.
         The amount of walls added is directly proportional to walls_factor.
+        The cells are sampled at once, in linear time. Regions isolated by these walls
+        are connected back by __connect_regions() after the maze is tracked.
         """
         amount = round(self.width * self.height * self.walls_factor)
         if amount <= 0:
             return
         cells = self.find_cells_by_mark(self.unvisited)
-        for _ in range(amount):
-            if len(cells) <= 1: # At least 1 place for the start cell should remain
-                break
-            cell = choice(cells)
-            cells.remove(cell)
+        # At least half of the cells remain for the start and finish cells, coins etc.
+        # (walls_factor 0.25 and more would wall up nearly all of them)
+        amount = min(amount, len(cells) // 2)
+        for cell in self.__random.sample(cells, amount):
             self.mark_cell(cell, self.wall)
 
     def pick_random_cell(self, mark: int) -> tuple:
@@ -148,9 +386,60 @@ class Maze:
         cell = None
         cells = self.find_cells_by_mark(mark)
         if cells:
-            cell = choice(cells)
+            cell = self.__random.choice(cells)
         return cell
 
+    def place_randomly(self, mark: int, amount: int, on: int | None = None) -> list:
+        """Put mark into the given amount of random distinct cells, which contain the mark on
+        (path by default). The maze is scanned only once for all the cells.
+        Return the list of marked cells (shorter than amount, if there are not enough cells).
+        """
+        if on is None:
+            on = self.path
+        cells = self.find_cells_by_mark(on)
+        chosen = self.__random.sample(cells, min(amount, len(cells)))
+        for cell in chosen:
+            self.mark_cell(cell, mark)
+        return chosen
+
+    def populate(self, robots: int = 1, doors: int = 1, monsters: int = 0, coins: int = 0) -> tuple:
+        """Put robots, doors, monsters and coins into the maze (in this order, so that
+        monsters and coins are not put onto robots and doors). The first robot is put into
+        start_cell, the first door into finish_cell, the others randomly.
+        Return tuple (robot_cells, door_cells, monster_cells, coin_cells).
+        """
+        robot_cells = []
+        if robots > 0:
+            self.mark_cell(self.start_cell, self.robot)
+            robot_cells = [self.start_cell] + self.place_randomly(self.robot, robots-1)
+        door_cells = []
+        if doors > 0:
+            self.mark_cell(self.finish_cell, self.door)
+            door_cells = [self.finish_cell] + self.place_randomly(self.door, doors-1)
+        monster_cells = self.place_randomly(self.monster, monsters)
+        coin_cells = self.place_randomly(self.coin, coins)
+        return robot_cells, door_cells, monster_cells, coin_cells
+
+    def hide_doors(self) -> list:
+        """Remove the doors from the maze (mark the cells with doors as paths).
+        Return the list of the cells of the hidden doors (see unhide_doors()).
+        """
+        hidden_doors = self.find_cells_by_mark(self.door)
+        for cell in hidden_doors:
+            self.mark_cell(cell, self.path)
+        return hidden_doors
+
+    def unhide_doors(self, hidden_doors: list) -> None:
+        """Put the doors back into the cells of the list hidden_doors and remove
+        the cells from the list. A cell occupied by a monster stays in the list
+        until the monster goes away.
+        """
+        for cell in hidden_doors[:]:
+            if self.check_mark(cell, self.monster):
+                continue
+            self.mark_cell(cell, self.door)
+            hidden_doors.remove(cell)
+
     def __get_unvisited_neighbours(self, cell: tuple) -> list:
         """Get and return a list of neighbour unvisited cells for the given cell.
         Assume, neighbors are those cells, which are to the left/right, below/above
@@ -204,40 +493,190 @@ class Maze:
         """Create a random maze in self.maze, the previously created blueprint.
         self.start_cell is used as the start point; the finish point is stored in self.finish_cell.
         The used labyrinth creation algorithm can be found here:
-        https://en.wikipedia.org/wiki/Maze_generation_algorithm#Recursive_implementation
+        https://en.wikipedia.org/wiki/Maze_generation_algorithm#Iterative_implementation_(with_stack)
+        (the recursive algorithm with an explicit stack, so big mazes do not hit the recursion limit).
         """
         # Mark the current cell as path.
         self.mark_cell(cell, self.path)
-        # Find all unvisited neighbour cells.
+        # The stack keeps the cells with their unvisited neighbour cells, which are still to be tried.
         # Walls between the actual cells have their coordinates, but are not considered as cells.
-        neighbours = self.__get_unvisited_neighbours(cell)
-        # While the current cell has neighbours
-        while len(neighbours) > 0:
-                # Choose a random neighbour
-                chosen = choice(neighbours)
-                # If that chosen is unvisited
-                if self.check_mark(chosen, self.unvisited):
-                    # Save the chosen in the instance attribute self.finish_cell
-                    self.finish_cell = chosen
-                    # Remove the wall between the chosen and the current cell, mark it as path
-                    self.__remove_wall(cell, chosen, self.path)
-                    # Initiate recursively the whole procedure for the chosen 
-                    self.__track_maze(chosen)
-                # Remove the chosen from the list of unvisited neighbour cells 
-                neighbours.remove(chosen)
-        return
-    
+        stack = [(cell, self.__get_unvisited_neighbours(cell))]
+        while stack:
+            cell, neighbours = stack[-1]
+            # If the current cell has no neighbours left, go back to the previous cell
+            if not neighbours:
+                stack.pop()
+                continue
+            # Choose a random neighbour, remove it from the list of unvisited neighbour cells
+            chosen = self.__random.choice(neighbours)
+            neighbours.remove(chosen)
+            # If that chosen is still unvisited
+            if self.check_mark(chosen, self.unvisited):
+                # Save the chosen in the instance attribute self.finish_cell
+                self.finish_cell = chosen
+                # Remove the wall between the chosen and the current cell, mark it as path
+                self.__remove_wall(cell, chosen, self.path)
+                # Continue the whole procedure from the chosen
+                self.mark_cell(chosen, self.path)
+                stack.append((chosen, self.__get_unvisited_neighbours(chosen)))
+
+    def __connect_regions(self) -> None:
+        """Make every path cell reachable from self.start_cell.
+        Additional walls (see __add_more_walls()) can isolate regions of unvisited cells:
+        track them as separate mazes, then join the regions with union-find,
+        removing randomly chosen walls between cells of different regions (Kruskal's algorithm).
+        Regions enclosed by the additional walls are joined through the wall cells between them
+        or, if needed, through the shortest ways across the walls.
+        """
+        unvisited = self.find_cells_by_mark(self.unvisited)
+        if not unvisited:
+            return
+        finish_cell = self.finish_cell
+        for cell in unvisited:
+            if self.check_mark(cell, self.unvisited):
+                self.__track_maze(cell)
+        # Keep the finish cell of the start region, if there is any
+        if finish_cell is not None:
+            self.finish_cell = finish_cell
+
+        parent = list(range(self.width * self.height))
+
+        def find(i: int) -> int:
+            while parent[i] != i:
+                parent[i] = parent[parent[i]]
+                i = parent[i]
+            return i
+
+        def union(i: int, j: int) -> bool:
+            root_i, root_j = find(i), find(j)
+            if root_i == root_j:
+                return False
+            parent[root_i] = root_j
+            return True
+
+        def join_open_cells() -> int:
+            """Union all neighbouring open cells. Return the amount of regions."""
+            regions = 0
+            for y in range(1, self.height-1):
+                row = self.maze[y]
+                for x in range(1, self.width-1):
+                    if row[x] == self.wall:
+                        continue
+                    regions += 1
+                    if row[x+1] != self.wall and union(y*self.width + x, y*self.width + x+1):
+                        regions -= 1
+                    if self.maze[y+1][x] != self.wall and union(y*self.width + x, (y+1)*self.width + x):
+                        regions -= 1
+            return regions
+
+        regions = join_open_cells()
+        # Walls between two path cells (one coordinate odd, the other even)
+        walls = [(x, y) for y in range(1, self.height-1) for x in range(1 + y%2, self.width-1, 2)
+                 if self.maze[y][x] == self.wall]
+        self.__random.shuffle(walls)
+        for x, y in walls:
+            if regions == 1:
+                return
+            if x % 2 == 0:
+                first, second = (x-1, y), (x+1, y)
+            else:
+                first, second = (x, y-1), (x, y+1)
+            if self.maze[first[1]][first[0]] == self.wall or self.maze[second[1]][second[0]] == self.wall:
+                continue
+            if union(first[1]*self.width + first[0], second[1]*self.width + second[0]):
+                self.maze[y][x] = self.path
+                union(y*self.width + x, first[1]*self.width + first[0])
+                regions -= 1
+
+        # Regions enclosed by the additional walls: open a wall cell (both coordinates odd)
+        # together with the walls to its neighbour cells from different regions
+        wall_cells = [(x, y) for y in range(1, self.height-1, 2) for x in range(1, self.width-1, 2)
+                      if self.maze[y][x] == self.wall]
+        self.__random.shuffle(wall_cells)
+        for x, y in wall_cells:
+            if regions == 1:
+                return
+            roots = {}
+            for nx, ny in ((x-2, y), (x+2, y), (x, y-2), (x, y+2)):
+                if 0 < nx < self.width-1 and 0 < ny < self.height-1 and self.maze[ny][nx] != self.wall:
+                    roots.setdefault(find(ny*self.width + nx), (nx, ny))
+            if len(roots) < 2:
+                continue
+            self.maze[y][x] = self.path
+            for nx, ny in roots.values():
+                self.maze[(y+ny)//2][(x+nx)//2] = self.path
+                union(((y+ny)//2)*self.width + (x+nx)//2, ny*self.width + nx)
+                union(y*self.width + x, ny*self.width + nx)
+            regions -= len(roots) - 1
+
+        # Regions separated by thicker walls (rare)
+        if regions > 1:
+            self.__break_through(find, union, regions)
+
+    def __break_through(self, find, union, regions: int) -> None:
+        """Join the remaining regions of open cells across the walls in one pass:
+        breadth-first search grows from all the regions at once, where two regions meet
+        the walls on the ways back to both of them are marked as path.
+        """
+        width = self.width
+        wall = self.wall
+        # Region (its root at the start) which reached the cell first and the cell it came from
+        owner = [-1] * (width * self.height)
+        came_from = [-1] * (width * self.height)
+        queue = deque()
+        for y in range(1, self.height-1):
+            row = self.maze[y]
+            for x in range(1, width-1):
+                if row[x] != wall:
+                    owner[y*width + x] = find(y*width + x)
+                    queue.append(y*width + x)
+        while queue and regions > 1:
+            current = queue.popleft()
+            for nearest in (current-1, current+1, current-width, current+width):
+                x, y = nearest % width, nearest // width
+                if x == 0 or y == 0 or x == width-1 or y == self.height-1:
+                    continue
+                if owner[nearest] == -1:
+                    owner[nearest] = owner[current]
+                    came_from[nearest] = current
+                    queue.append(nearest)
+                elif union(owner[current], owner[nearest]):
+                    # Two regions met: open the walls on the ways back to both of them
+                    for step in (current, nearest):
+                        while self.maze[step // width][step % width] == wall:
+                            self.maze[step // width][step % width] = self.path
+                            step = came_from[step]
+                    regions -= 1
+
+    def __farthest_cell(self, cell: tuple) -> tuple:
+        """Return the open cell farthest from the given cell (breadth-first search),
+        the given cell itself, if no other cell is reachable.
+        """
+        width = self.width
+        grid = self.maze
+        start = cell[1]*width + cell[0]
+        seen = {start}
+        queue = deque([start])
+        current = start
+        while queue:
+            current = queue.popleft()
+            for nearest in (current-1, current+1, current-width, current+width):
+                if nearest not in seen and grid[nearest // width][nearest % width] != self.wall:
+                    seen.add(nearest)
+                    queue.append(nearest)
+        return current % width, current // width
+
     def __parse_cell(self, cell: tuple) -> tuple:
         """Check cell is in correct format: tuple with two integers. 
-        Return (x, y) or raise ValueError.
+        Return (x, y) or raise ValueError (also for fractional coordinates, e.g. 2.5).
         """
         try:
             x, y = cell
-            x, y = int(x), int(y)
+            x, y = index(x), index(y)
         except (TypeError, ValueError):
             raise ValueError(f"cell must be a tuple of two integers (x, y), given: {cell}")
         return x, y
-    
+
     def get_nearest(self, cell: tuple) -> list:
         """Get and return a list of the four nearest cells' coordinates, 
         surrounding the given cell (left, right, above, below).
@@ -267,10 +706,10 @@ class Maze:
         """Find all cells containing mark and return their coordinates in a list of tuples (x, y).
         """
         found = []
-        # Iterate over self, the maze cell by cell
-        for m, cell in self:
-            if m == mark:
-                found.append(cell)
+        # Iterate over the maze row by row, skip the rows without the mark
+        for y, row in enumerate(self.maze):
+            if mark in row:
+                found.extend([(x, y) for x, m in enumerate(row) if m == mark])
         return found
 
     def dead_ends(self) -> list:
@@ -281,9 +720,62 @@ class Maze:
         return [cell for cell in paths if self.is_dead_end(cell)]
 
     def mark_cell(self, cell: tuple, mark: int) -> None:
-        """Place mark in the given cell of the maze."""
+        """Place mark in the given cell of the maze.
+        Registered listeners are called as listener((x, y), old_mark, new_mark).
+        """
         x, y = self.__parse_cell(cell)
-        self.maze[y][x] = mark
+        old_mark = self.maze[y][x]
+        try:
+            self.maze[y][x] = mark
+        except TypeError:
+            # Read-only row of the shared grid (see attach())
+            if not self.__copy_on_write:
+                raise
+            self.__own_row(y)[x] = mark
+        for listener in self.__listeners:
+            listener((x, y), old_mark, mark)
+
+    def snapshot(self) -> bytes:
+        """Return the marks of the whole maze as bytes, row by row.
+        The maze can be returned to this state with restore().
+        """
+        return b''.join(bytes(row) for row in self.maze)
+
+    def restore(self, snapshot: bytes) -> None:
+        """Put the marks from the snapshot (see snapshot()) back into the maze.
+        Rows are overwritten in place, listeners are not called (junction graph is rebuilt).
+        """
+        if len(snapshot) != self.width * self.height:
+            raise ValueError(f"snapshot must have {self.width * self.height} bytes, given: {len(snapshot)}")
+        view = memoryview(snapshot)
+        for y, row in enumerate(self.maze):
+            try:
+                row[:] = view[y*self.width:(y+1)*self.width]
+            except TypeError:
+                # Read-only row of the shared grid (see attach())
+                if not self.__copy_on_write:
+                    raise
+                self.__own_row(y)[:] = view[y*self.width:(y+1)*self.width]
+        if self.__graph is not None:
+            self.__graph.rebuild()
+
+    def junction_graph(self) -> JunctionGraph:
+        """Return the graph of junctions, dead ends and corridors of the maze (see graph.JunctionGraph).
+        The graph is built on the first call and then kept up to date by mark_cell().
+        """
+        if self.__graph is None:
+            self.__graph = JunctionGraph(self)
+        return self.__graph
+
+    def add_listener(self, listener) -> None:
+        """Register callable listener((x, y), old_mark, new_mark), 
+        which is called on every mark_cell() after the mark is placed.
+        """
+        self.__listeners.append(listener)
+
+    def remove_listener(self, listener) -> None:
+        """Unregister the listener previously added with add_listener()."""
+        self.__listeners.remove(listener)
 
     def check_mark(self, cell: tuple, mark: int) -> bool:
         """Check the given cell contains the given mark. Return True or False."""
@@ -297,7 +789,8 @@ class Maze:
 
 
 if __name__ == "__main__":
+    import sys
     maze = Maze(30, 20)
     maze.mark_cell(maze.start_cell, maze.robot)
     maze.mark_cell(maze.finish_cell, maze.door)
-    print(maze)
\ No newline at end of file
+    maze.write_text(sys.stdout)
\ No newline at end of file
@@ -1,5 +1,4 @@
-import pygame
-from random import choice
+from random import Random, choice
 from maze import Maze
 
 
@@ -7,19 +6,23 @@ class Robot:
     """
     Robot(Maze, cell) -> new Robot object with rams=0 and coins=0.
     Robot(Maze, cell, rams=N, coins=K) -> new Robot object with rams=N and coins=K.
+    Robot(Maze, cell, telemetry=T) -> new Robot object emitting coin, ram and exit events
+    into telemetry.Telemetry object T.
 
-    Robot represents the object, which can be moved through the maze by user via the keyboard.
+    Robot represents the object, which can be moved through the maze by user 
+    (via the keyboard, see controls.RobotControls) or by a program.
     Robot object provides public attributes and methods.
     
     Attributes:
     coins (amount of coins collected),
     rams (rams left),
+    direction (left, right, up, down),
     game_status (None, "passed", "gameover").
 
     Methods:
-    process_event(event), move_robot(), set_keys(left, right, up, down, break_wall).
+    move_robot(), set_direction(left, right, up, down), break_wall().
     """
-    def __init__(self, maze: Maze, cell: tuple, rams=0, coins=0):
+    def __init__(self, maze: Maze, cell: tuple, rams=0, coins=0, telemetry=None):
         self.__x = cell[0]
         self.__y = cell[1]
         self.__left = False
@@ -30,23 +33,39 @@ class Robot:
         self.__maze = maze
         self.coins = coins
         self.game_status = None
-        self.set_keys(pygame.K_j, pygame.K_l, pygame.K_i, pygame.K_k, pygame.K_SPACE)
+        self.__telemetry = telemetry
 
     @property
     def rams(self):
         return self.__rams
 
+    @property
+    def cell(self) -> tuple:
+        """Current coordinates (x, y) of the robot."""
+        return self.__x, self.__y
+
+    @property
+    def direction(self) -> tuple:
+        """Current movement direction flags (left, right, up, down)."""
+        return self.__left, self.__right, self.__up, self.__down
+
     def decrease_rams(self):
         """Decrease rams by one. Rams can not be less than 0."""
         if self.__rams - 1 >= 0:
             self.__rams -= 1
 
-    def set_keys(self, left_k, right_k, up_k, down_k, break_wall_k):
-        self.__left_k = left_k
-        self.__right_k = right_k
-        self.__up_k = up_k
-        self.__down_k = down_k
-        self.__break_wall_k = break_wall_k
+    def set_direction(self, left=False, right=False, up=False, down=False) -> None:
+        """Set the movement direction directly, without keyboard events
+        (e.g. when robot is controlled by a program).
+        """
+        self.__left = left
+        self.__right = right
+        self.__up = up
+        self.__down = down
+
+    def break_wall(self) -> None:
+        """Break the wall in the current movement direction (see set_direction())."""
+        self.__break_wall(self.__x, self.__y)
 
     def __break_wall(self, x, y):
         """Break (remove) the wall in front of the robot (the wall hindering robot's movement).
@@ -74,37 +93,14 @@ class Robot:
         if wall_cell:
             self.__maze.mark_cell(wall_cell, self.__maze.path)
             self.decrease_rams()
+            if self.__telemetry:
+                self.__telemetry.emit("ram", self.__rams)
         else:
             return
 
-    def process_event(self, event: pygame.event.Event) -> None:
-        """Process event: do corresponding action when a known key pressed."""
-        if event.type == pygame.KEYDOWN:
-            if event.key == self.__left_k:
-                self.__left = True
-            if event.key == self.__right_k:
-                self.__right = True
-            if event.key == self.__up_k:
-                self.__up = True
-            if event.key == self.__down_k:
-                self.__down = True
-            if event.key == self.__break_wall_k:
-                self.__break_wall(self.__x, self.__y)
-
-        if event.type == pygame.KEYUP:
-            if event.key == self.__left_k:
-                self.__left = False
-            if event.key == self.__right_k:
-                self.__right = False
-            if event.key == self.__up_k:
-                self.__up = False
-            if event.key == self.__down_k:
-                self.__down = False
-        self.move_robot()
-
     def move_robot(self) -> None:
-        """Move robot in the maze according to the key pressed.
-        If robot hits the wall, do not move.
+        """Move robot by one cell in the maze according to the direction set.
+        If robot hits the wall or another robot, do not move.
         If robot hits a monster, change self.game_status to "gameover".
         If robot hits a coin, collect it.
         If robot hits the door, change self.game_status to "passed".
@@ -113,8 +109,9 @@ class Robot:
         if self.game_status in ["gameover", "passed"]:
             return
 
-        step = 0.5 
-        # TODO: why step=1 does not work as expected
+        # Robot moves by one cell per call: the speed is set by how often it is called
+        # (TheWay calls it once per simulation tick, see the_way.TICK_RATE)
+        step = 1
 
         # Save current coords
         target_x = self.__x
@@ -135,20 +132,24 @@ class Robot:
             return
         
         target_mark = self.__maze.get_mark((target_x, target_y))
-        # If target cell is a wall, do not move -> return
-        if target_mark == self.__maze.wall:
+        # If target cell is a wall or another robot (several robots share the maze, see server.py),
+        # do not move -> return
+        if target_mark in (self.__maze.wall, self.__maze.robot):
             return
         # If target cell is a monster, do not move -> return
         if target_mark == self.__maze.monster:
-            self.game_status == "gameover"
+            self.game_status = "gameover"
             return 
         # If target cell is a coin
         if target_mark == self.__maze.coin:
             self.coins += 1
+            if self.__telemetry:
+                self.__telemetry.emit("coin", self.coins)
         # If target cell is a door
         if target_mark == self.__maze.door:
             self.game_status = "passed"
-            pass
+            if self.__telemetry:
+                self.__telemetry.emit("exit")
 
         # Update the state of the maze:
         # 1) mark the old cell as path (robot left the cell)
@@ -165,8 +166,14 @@ class Robot:
 class Monster:
     """
     Monster(Maze, cell) -> new Monster object.
+    Monster(Maze, cell, interval=N) -> new Monster object moving every N-th call of move_monster().
+    Monster(Maze, cell, rng=R) -> new Monster object choosing its way with random.Random object R
+    (by default, with the module random).
 
     Monster represents the object moving intelligently on its own through the maze.
+    Monster decides its way only at the junctions and dead ends of the maze
+    (the nodes of Maze.junction_graph()): it chooses randomly the next neighbouring node,
+    avoiding the already visited ones, and follows the corridor to it cell by cell.
     Monster object provides public attributes and methods.
 
     Attributes:
@@ -175,98 +182,92 @@ class Monster:
     which is used to process cells which have been moved over by monster.
 
     Methods:
-    move_monster().
+    move_monster(), step().
     """
-    def __init__(self, maze: Maze, cell: tuple, speed: int=1) -> None:
+    # Maximum amount of targets tried by one step() before monster gives up moving
+    MAX_ATTEMPTS = 4
+
+    def __init__(self, maze: Maze, cell: tuple, speed: int=1, interval: int=30, rng: Random | None = None) -> None:
         self.__x = cell[0]
         self.__y = cell[1]
         self.__speed = speed # TODO: currently not used
+        self.__choice = choice if rng is None else rng.choice
         self.__cycles = 0
+        self.interval = interval
         self.__maze = maze
-        self.__closed_cells = set()
-        self.__visited_cells = set()
+        # Cells left on the way to the next node, the next cell last
+        self.__route = []
+        # Cell of the monster, which blocked the way last time
+        self.__blocked = None
+        # Visited nodes are remembered as generation stamps indexed by cell id
+        # (y*width + x): a node is visited, if its stamp equals the current generation.
+        # Forgetting all nodes is done by moving to the next generation.
+        self.__width = maze.width
+        self.__visited_cells = bytearray(maze.width * maze.height)
+        self.__visited_generation = 1
         self.game_status = None
         self.overlapped = {}
-    
-    def __get_available_paths(self, cell: tuple) -> list:
-        """Get and return the list of the nearest paths (cells), where monster can move to.
-        The cells with walls and other monsters and the cells from self.__closed_cells
-        are considered as not available for movement.
-        (A cell gets into self.__closed_cells, if it is considered as closed end by the
-        self.__is_closed_end() method. See also __track() method.)
+
+    @property
+    def cell(self) -> tuple:
+        """Current coordinates (x, y) of the monster."""
+        return self.__x, self.__y
+
+    def __forget_visited_cells(self) -> None:
+        """Forget all visited nodes in O(1): move to the next generation.
+        Stamps are zeroed only when the byte-sized generation overflows.
         """
-        # Get all the nearest cells
-        nearest_cells = self.__maze.get_nearest(cell)
-        excluded_marks = [self.__maze.wall, self.__maze.monster]
-        # Exclude
-        nearest_paths = [cell for cell in nearest_cells if self.__maze.get_mark(cell) not in excluded_marks]
-        # Subtract the closed cells
-        available_paths = set(nearest_paths).difference(self.__closed_cells)
-        return list(available_paths)
-    
-    def __is_closed_end(self, cell: tuple) -> bool:
-        """Return True, if monster is in the dead end of the maze or
-        if there is 1 or less paths considered available.
-        Else return False."""
-        if self.__maze.is_dead_end(cell):
-            return True
-        
-        available_paths = self.__get_available_paths(cell)
-        if len(available_paths) <= 1:
-            return True
-        return False
-
-    def __track(self, cell: tuple) -> tuple:
-        """Track the maze: find the way through the maze choosing randomly on crossings 
-        but avoiding going to the already visited places.        
+        self.__visited_generation += 1
+        if self.__visited_generation > 255:
+            self.__visited_cells[:] = bytes(len(self.__visited_cells))
+            self.__visited_generation = 1
+
+    def __get_ways(self, cell: tuple) -> list:
+        """Get and return the list of the ways (lists of cells, the cell excluded)
+        from the cell to the nearest nodes of the junction graph.
+        The way through the monster, which blocked the monster last time, is excluded.
         """
-        current_cell = cell
-       
-       # If current cell is considred closed end
-        if self.__is_closed_end(current_cell):
-            # Remember current cell as closed_cell
-            self.__closed_cells.add(current_cell)
-            # Find the available for movement paths 
-            # (excluding walls, other monsters and currently known closed_cells)
-            available_paths = self.__get_available_paths(current_cell)
-            # If there are no available paths
-            if len(available_paths) == 0:
-                # Forget all known closed_cells and visited_cells
-                self.__closed_cells.clear()
-                self.__visited_cells.clear()
-                return current_cell
-            # If it is a closed end and still a path exists, there is only one path.
-            # Move to this path.
-            current_cell = available_paths[0]
-            return current_cell
-        
-        # If current cell is not closed end,
-        # Remember current cell as visited_cell
-        self.__visited_cells.add(current_cell)
-        
-        # Find the available for movements paths
-        # (excluding walls, other monsters and currently known closed_cells)
-        paths = self.__get_available_paths(current_cell)
-        
-        # If there are no paths left (it is dead end because of the closed cells),
-        # clear the closed cells list, find paths again
-        if len(paths) == 0:
-            self.__closed_cells.clear()
-            paths = self.__get_available_paths(current_cell)
-        
-        # From the available paths exclude visited_cells
-        paths_visited_excluded = set(paths).difference(self.__visited_cells)
-        # If there are paths left, choose one randomly
-        if len(paths_visited_excluded) > 0:
-            next_cell = choice(list(paths_visited_excluded))
+        graph = self.__maze.junction_graph()
+        if graph.is_node(cell):
+            ways = [graph.way(cell, node) for node in graph.nodes.get(cell, ())]
         else:
-            # If there are no paths left because of the visited cell, 
-            # clear the list of visited cells
-            self.__visited_cells.clear()
-            # Choose from paths (including the visited)
-            next_cell = choice(list(paths))
-            
-        return next_cell
+            # Monster is in a corridor (e.g. at start): go to one of its ends
+            cells = graph.corridor(cell)
+            i = cells.index(cell)
+            ways = [cells[i-1::-1] if i > 0 else None, cells[i+1:]]
+        return [way for way in ways if way and way[0] != self.__blocked]
+
+    def __choose_route(self) -> None:
+        """Choose the way to the next node randomly, but avoiding the already visited nodes,
+        and remember it as self.__route.
+        """
+        x, y = self.__x, self.__y
+        self.__visited_cells[y*self.__width + x] = self.__visited_generation
+        ways = self.__get_ways((x, y))
+        if not ways:
+            self.__blocked = None
+            return
+        visited_cells = self.__visited_cells
+        generation = self.__visited_generation
+        width = self.__width
+        ways_visited_excluded = [way for way in ways if visited_cells[way[-1][1]*width + way[-1][0]] != generation]
+        if ways_visited_excluded:
+            way = self.__choice(ways_visited_excluded)
+        else:
+            # All nodes around are visited: forget them
+            self.__forget_visited_cells()
+            way = self.__choice(ways)
+        self.__route = way[::-1]
+
+    def __next_cell(self) -> tuple:
+        """Return the next cell on the route (choosing a new route, if needed)
+        or the current cell, if there is no way to go.
+        """
+        if not self.__route:
+            self.__choose_route()
+        if not self.__route:
+            return self.__x, self.__y
+        return self.__route.pop()
 
     def __process_overlapped(self) -> None:
         """Process cells wich has been overlapped by monster:
@@ -285,34 +286,42 @@ class Monster:
         self.overlapped[cell] = mark
 
     def move_monster(self) -> None:
-        """Move monster in the maze randomly but intelligently using __track() method.
+        """Move monster in the maze (see step()) every self.interval-th call.
+        """
+        # Make monster move only every 30th (self.interval-th) iteration
+        self.__cycles += 1
+        if self.__cycles > self.interval:
+            self.__cycles = 0
+        if self.__cycles < self.interval:
+            return
+        self.step()
+
+    def step(self) -> None:
+        """Move monster in the maze by one cell along its route (see __choose_route()).
         If monster hits robot, change self.game_status to "gameover".
-        If monster hits another monster, do not move.
+        If monster hits another monster, do not move and choose a new route next time.
         If monster hits a coin or a door, skip it (leave it on place). 
+        If no acceptable target is found in MAX_ATTEMPTS tries, do not move.
         """
         # Do not move, if game_status is "gameover" or "passed"
         if self.game_status in ["gameover", "passed"]:
             return 
 
-        # Make monster move only every 30th iteration
-        self.__cycles += 1
-        if self.__cycles > 30:
-            self.__cycles = 0
-        if self.__cycles < 30:
-            return
-        
-        while True:
-            # Get target coords for the current location 
-            # from the intelligent self.__track() method.
-            target_x, target_y = self.__track((self.__x, self.__y))
+        for _ in range(self.MAX_ATTEMPTS):
+            # Get target coords from the route of the monster
+            target_x, target_y = self.__next_cell()
+            if (target_x, target_y) == (self.__x, self.__y):
+                return
             target_mark = self.__maze.get_mark((target_x, target_y))
 
             # If target cell is a robot, game is over
             if target_mark == self.__maze.robot:
                 self.game_status = "gameover"
                 return
-            # If target mark is a monster, do not move
+            # If target mark is a monster, do not move, try another way next time
             if target_mark == self.__maze.monster:
+                self.__route = []
+                self.__blocked = (target_x, target_y)
                 return
             # If target cell is a coin, move on, remember the overlapped coin
             if target_mark == self.__maze.coin:
@@ -325,6 +334,10 @@ class Monster:
             # If target cell is a path, exit loop
             if target_mark == self.__maze.path:
                 break
+            # Otherwise (e.g. a wall appeared on the way), choose a new route
+            self.__route = []
+        else:
+            return
 
         # Update the state of the maze:
         # 1) mark the old cell as path (robot left the cell)
@@ -335,6 +348,7 @@ class Monster:
         # Update the coordinates (x, y) of the instance with the new ones.
         self.__x = target_x
         self.__y = target_y
+        self.__blocked = None
         # After robot has moved to a new place, process overlapped cells
         self.__process_overlapped()
 
@@ -0,0 +1,100 @@
+from __future__ import annotations
+#from typing import Self  # available from Python 3.11
+import pygame
+from maze import Maze
+
+
+class TileRenderer:
+    """
+    TileRenderer(Maze, images, square_size, background) -> new TileRenderer object drawing the maze
+    with images {mark: image} centered in the squares of square_size pixels, the cells without image
+    inside the outer walls are filled with the background color.
+    TileRenderer(Maze, images, square_size, background, moving_marks=M) -> the same, but the cells
+    with the marks M (e.g. robot and monster) are drawn as background: the images of the moving objects
+    are drawn by draw() as sprites on top of the maze.
+
+    TileRenderer keeps the image of the whole maze in a surface. It is composed in bulk:
+    the positions of the images are precomputed for every mark, so the full redraw
+    is one fill and one Surface.blits() call. Afterwards only the cells changed by
+    Maze.mark_cell() (TileRenderer listens to it) are drawn again, and drawing the frame
+    is one blit of the maze surface (plus one Surface.blits() call for the sprites).
+
+    Attributes:
+    surface (the image of the maze).
+
+    Methods:
+    draw(window, position, sprites), redraw(), close().
+    """
+    def __init__(self, maze: Maze, images: dict, square_size: int, background: pygame.color.Color,
+                 moving_marks: tuple = ()) -> None:
+        self.__maze = maze
+        self.__sprite_images = images
+        # Images drawn into the surface of the maze
+        self.__images = {mark: image for mark, image in images.items() if mark not in moving_marks}
+        self.__size = square_size
+        self.__background = background
+        # Offsets (x, y) of the image in the square: the image is centered
+        self.__offsets = {mark: ((square_size - image.get_width()) // 2, (square_size - image.get_height()) // 2)
+                          for mark, image in images.items()}
+        self.surface = pygame.Surface((maze.width * square_size, maze.height * square_size))
+        if pygame.display.get_surface() is not None:
+            self.surface = self.surface.convert()
+        self.__dirty = set()
+        self.redraw()
+        maze.add_listener(self.__on_mark)
+
+    def __on_mark(self, cell: tuple, old_mark: int, mark: int) -> None:
+        self.__dirty.add(cell)
+
+    def close(self) -> None:
+        """Stop listening to the maze changes."""
+        self.__maze.remove_listener(self.__on_mark)
+
+    def redraw(self) -> None:
+        """Draw the whole maze again (e.g. after Maze.restore(), which does not call the listeners)."""
+        size = self.__size
+        maze = self.__maze
+        self.__dirty.clear()
+        self.surface.fill(pygame.Color("black"))
+        self.surface.fill(self.__background, (size, size, (maze.width - 2) * size, (maze.height - 2) * size))
+        images = self.__images
+        offsets = self.__offsets
+        batch = []
+        for y, row in enumerate(maze.maze):
+            top = y * size
+            for x, mark in enumerate(row):
+                if mark in images:
+                    offset_x, offset_y = offsets[mark]
+                    batch.append((images[mark], (x*size + offset_x, top + offset_y)))
+        self.surface.blits(batch, doreturn=False)
+
+    def __update(self) -> None:
+        """Draw again the cells changed since the last update."""
+        size = self.__size
+        grid = self.__maze.maze
+        images = self.__images
+        offsets = self.__offsets
+        batch = []
+        for x, y in self.__dirty:
+            self.surface.fill(self.__background, (x*size, y*size, size, size))
+            mark = grid[y][x]
+            if mark in images:
+                offset_x, offset_y = offsets[mark]
+                batch.append((images[mark], (x*size + offset_x, y*size + offset_y)))
+        self.__dirty.clear()
+        self.surface.blits(batch, doreturn=False)
+
+    def draw(self, window: pygame.surface.Surface, position: tuple, sprites: list = ()) -> None:
+        """Draw the maze onto the window with its upper left corner at position (x, y),
+        then the sprites [(mark, (x, y))] on top of it, x and y are cell coordinates (can be fractional).
+        """
+        if self.__dirty:
+            self.__update()
+        window.blit(self.surface, position)
+        if sprites:
+            left, top = position
+            size = self.__size
+            images = self.__sprite_images
+            offsets = self.__offsets
+            window.blits([(images[mark], (left + x*size + offsets[mark][0], top + y*size + offsets[mark][1]))
+                          for mark, (x, y) in sprites if mark in images], doreturn=False)
@@ -0,0 +1,73 @@
+from __future__ import annotations
+#from typing import Self  # available from Python 3.11
+from time import perf_counter
+from moving_objects import Monster
+
+
+class MonsterScheduler:
+    """
+    MonsterScheduler(monsters) -> new MonsterScheduler object for the given list of monsters.
+    MonsterScheduler(monsters, interval=N, budget=S, near_distance=D, far_factor=F) -> the same with
+    monsters moving every N ticks, at most S seconds spent on monsters per frame,
+    monsters further than D cells from robot moving F times less often.
+
+    MonsterScheduler replaces calling Monster.move_monster() for every monster every tick.
+    Monsters are staggered over the interval, so that their moves are spread evenly across ticks
+    instead of all of them moving on the same tick.
+    When the time budget is spent, the rest of the due monsters
+    move on the next tick(s), starting from the first one not served.
+    A frame running several ticks shares one budget between them (see deadline()).
+
+    Methods:
+    deadline(), update(robot_cell, deadline).
+    """
+    def __init__(self, monsters: list[Monster], interval: int = 30, budget: float = 0.002,
+                 near_distance: int = 15, far_factor: int = 3) -> None:
+        self.monsters = list(monsters)
+        self.interval = interval
+        self.budget = budget
+        self.near_distance = near_distance
+        self.far_factor = far_factor
+        self.tick = 0
+        amount = max(len(self.monsters), 1)
+        # Frame on which every monster is due to move next, staggered over the interval
+        self.__due = [1 + (i * interval) // amount for i in range(len(self.monsters))]
+        self.__cursor = 0
+
+    def __next_interval(self, monster: Monster, robot_cell: tuple | None) -> int:
+        """Return amount of ticks until the monster's next move (level of detail by distance to robot)."""
+        if robot_cell is None:
+            return self.interval
+        x, y = monster.cell
+        distance = abs(x - robot_cell[0]) + abs(y - robot_cell[1])
+        if distance > self.near_distance:
+            return self.interval * self.far_factor
+        return self.interval
+
+    def deadline(self) -> float:
+        """Return the perf_counter() time, when the budget of a frame starting now is spent."""
+        return perf_counter() + self.budget
+
+    def update(self, robot_cell: tuple | None = None, deadline: float | None = None) -> int:
+        """Advance by one tick: move the monsters which are due, until the deadline
+        (by default, until the budget is spent from now on, see deadline()).
+        At least one monster is moved per tick, if any is due. Return amount of moved monsters.
+        """
+        self.tick += 1
+        amount = len(self.monsters)
+        if deadline is None:
+            deadline = self.deadline()
+        moved = 0
+        for k in range(amount):
+            i = (self.__cursor + k) % amount
+            if self.__due[i] > self.tick:
+                continue
+            if moved and perf_counter() > deadline:
+                # Continue from this monster on the next tick
+                self.__cursor = i
+                return moved
+            monster = self.monsters[i]
+            monster.step()
+            moved += 1
+            self.__due[i] = self.tick + self.__next_interval(monster, robot_cell)
+        return moved
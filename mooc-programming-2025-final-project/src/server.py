@@ -0,0 +1,326 @@
+from __future__ import annotations
+#from typing import Self  # available from Python 3.11
+import asyncio
+import json
+from maze import Maze
+from moving_objects import Robot, Monster
+
+
+# Actions sent by clients: action -> (left, right, up, down)
+DIRECTIONS = {
+    "stay": (False, False, False, False),
+    "left": (True, False, False, False),
+    "right": (False, True, False, False),
+    "up": (False, False, True, False),
+    "down": (False, False, False, True),
+}
+
+
+def encode(message: dict) -> bytes:
+    """Encode message as one line of compact JSON."""
+    return json.dumps(message, separators=(',', ':')).encode() + b'\n'
+
+
+class GameServer:
+    """
+    GameServer(width, height) -> new GameServer object with 2 robots in the new maze.
+    GameServer(width, height, robots=N, monsters=M, coins=C, rams=R, tick_rate=T) -> the same
+    with N robots, M monsters, C coins, R rams per robot and T ticks per second.
+
+    GameServer is the authoritative owner of one game of TheWay, played by several clients
+    over TCP or Unix sockets. Every client controls its own robot.
+
+    Protocol: every message is one line of JSON.
+    Client -> server: {"action": "left"|"right"|"up"|"down"|"stay"|"break"};
+    the direction is held until another direction is sent.
+    Server -> client: on connect {"type": "snapshot", ...} with the full maze,
+    then {"type": "delta", ...} per tick with only the cells changed during the tick,
+    positions of moved robots and monsters and the game status, if changed.
+    Ticks without changes are not sent. So bandwidth and tick cost depend
+    on the amount of changes, not on the size of the maze.
+
+    Methods:
+    tick(), snapshot(), start_tcp(host, port), start_unix(path), run(), close().
+    """
+    def __init__(self, width: int, height: int, robots: int = 2, monsters: int = 2,
+                 coins: int = 10, rams: int = 2, tick_rate: int = 30) -> None:
+        self.tick_rate = tick_rate
+        self.tick_number = 0
+        self.status = None
+        self.maze = Maze(width, height)
+
+        # The door is hidden until all coins are collected (see Maze.hide_doors()).
+        robot_cells, _, monster_cells, coin_cells = self.maze.populate(robots=robots, monsters=monsters, coins=coins)
+        self.coins_total = len(coin_cells)
+        self.hidden_doors = self.maze.hide_doors()
+
+        self.robots = [Robot(self.maze, cell, rams=rams) for cell in robot_cells]
+        # Robots move by one cell per tick, monsters twice a second whatever the tick rate
+        self.monsters = [Monster(self.maze, cell, interval=max(1, tick_rate // 2)) for cell in monster_cells]
+        self.__robot_states = [self.__robot_state(robot) for robot in self.robots]
+        self.__monster_cells = [monster.cell for monster in self.monsters]
+
+        # Cells changed during the current tick: (x, y) -> mark before the tick
+        self.__changed = {}
+        self.maze.add_listener(self.__on_mark)
+
+        self.__clients = {}  # writer -> robot index or None (spectator)
+        self.__handlers = set()
+        self.__servers = []
+        self.__running = False
+
+    def __on_mark(self, cell: tuple, old_mark: int, mark: int) -> None:
+        self.__changed.setdefault(cell, old_mark)
+
+    def __robot_state(self, robot: Robot) -> list:
+        x, y = robot.cell
+        return [x, y, robot.coins, robot.rams, robot.game_status]
+
+    def snapshot(self) -> dict:
+        """Return the full state of the game as a message."""
+        return {
+            "type": "snapshot",
+            "tick": self.tick_number,
+            "width": self.maze.width,
+            "height": self.maze.height,
+            "maze": [''.join(str(mark) for mark in row) for row in self.maze.maze],
+            "robots": self.__robot_states,
+            "monsters": self.__monster_cells,
+            "status": self.status,
+        }
+
+    def __process_doors(self) -> None:
+        """Unhide the doors, when all coins are collected by robots."""
+        if self.hidden_doors and sum(robot.coins for robot in self.robots) >= self.coins_total:
+            self.maze.unhide_doors(self.hidden_doors)
+
+    def __update_status(self) -> None:
+        """Game is over when a monster catches any robot, and passed when any robot exits."""
+        statuses = [robot.game_status for robot in self.robots]
+        statuses += [monster.game_status for monster in self.monsters]
+        if "gameover" in statuses:
+            self.status = "gameover"
+        elif "passed" in statuses:
+            self.status = "passed"
+        else:
+            return
+        for moving_object in self.robots + self.monsters:
+            moving_object.game_status = self.status
+
+    def tick(self) -> dict | None:
+        """Advance the game by one tick. Return the delta message or None, if nothing changed."""
+        self.tick_number += 1
+        status = self.status
+        for robot in self.robots:
+            robot.move_robot()
+        for monster in self.monsters:
+            monster.move_monster()
+        self.__process_doors()
+        self.__update_status()
+
+        delta = {}
+        # Cells marked several times during the tick are sent only if the final mark differs
+        grid = self.maze.maze
+        cells = [[x, y, grid[y][x]] for (x, y), old_mark in self.__changed.items() if grid[y][x] != old_mark]
+        self.__changed = {}
+        if cells:
+            delta["cells"] = cells
+        robots = {}
+        for i, robot in enumerate(self.robots):
+            state = self.__robot_state(robot)
+            if state != self.__robot_states[i]:
+                self.__robot_states[i] = state
+                robots[i] = state
+        if robots:
+            delta["robots"] = robots
+        monsters = {}
+        for i, monster in enumerate(self.monsters):
+            if monster.cell != self.__monster_cells[i]:
+                self.__monster_cells[i] = monster.cell
+                monsters[i] = monster.cell
+        if monsters:
+            delta["monsters"] = monsters
+        if self.status != status:
+            delta["status"] = self.status
+        if not delta:
+            return None
+        delta["type"] = "delta"
+        delta["tick"] = self.tick_number
+        return delta
+
+    def __process_action(self, robot: Robot, action: str) -> None:
+        if action == "break":
+            robot.break_wall()
+        elif action in DIRECTIONS:
+            robot.set_direction(*DIRECTIONS[action])
+
+    async def __handle_client(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter) -> None:
+        """Assign a free robot (if any) to the client, send the snapshot,
+        then process actions of the client until it disconnects.
+        """
+        taken = set(self.__clients.values())
+        free = [i for i in range(len(self.robots)) if i not in taken]
+        index = free[0] if free else None
+        self.__clients[writer] = index
+        self.__handlers.add(asyncio.current_task())
+        hello = self.snapshot()
+        hello["robot"] = index
+        writer.write(encode(hello))
+        try:
+            while line := await reader.readline():
+                if index is None:
+                    continue
+                try:
+                    action = json.loads(line)["action"]
+                except (ValueError, KeyError, TypeError):
+                    continue
+                self.__process_action(self.robots[index], action)
+        except ConnectionError:
+            pass
+        finally:
+            self.__clients.pop(writer, None)
+            self.__handlers.discard(asyncio.current_task())
+            writer.close()
+
+    def broadcast(self, message: dict) -> None:
+        """Send the message to all the clients. Clients which do not read are disconnected."""
+        data = encode(message)
+        for writer in list(self.__clients):
+            if writer.is_closing() or writer.transport.get_write_buffer_size() > 1 << 20:
+                self.__clients.pop(writer, None)
+                writer.close()
+                continue
+            writer.write(data)
+
+    async def start_tcp(self, host: str = '127.0.0.1', port: int = 0) -> tuple:
+        """Start listening on TCP socket. Return the actual (host, port)."""
+        server = await asyncio.start_server(self.__handle_client, host, port)
+        self.__servers.append(server)
+        return server.sockets[0].getsockname()[:2]
+
+    async def start_unix(self, path: str) -> None:
+        """Start listening on Unix socket with the given path."""
+        server = await asyncio.start_unix_server(self.__handle_client, path)
+        self.__servers.append(server)
+
+    async def run(self, ticks: int | None = None) -> None:
+        """Run the game loop with self.tick_rate ticks per second,
+        broadcast deltas to the clients. Stop after the given amount of ticks,
+        if given, or when close() is called.
+        """
+        loop = asyncio.get_running_loop()
+        interval = 1 / self.tick_rate
+        next_time = loop.time()
+        self.__running = True
+        while self.__running and (ticks is None or ticks > 0):
+            delta = self.tick()
+            if delta:
+                self.broadcast(delta)
+            if ticks is not None:
+                ticks -= 1
+            next_time += interval
+            await asyncio.sleep(max(0, next_time - loop.time()))
+
+    async def close(self) -> None:
+        """Stop the game loop, the listening sockets and disconnect the clients."""
+        self.__running = False
+        for server in self.__servers:
+            server.close()
+            await server.wait_closed()
+        self.__servers = []
+        for writer in list(self.__clients):
+            writer.close()
+        self.__clients = {}
+        # Handlers finish, when their connections are closed
+        await asyncio.gather(*self.__handlers, return_exceptions=True)
+
+
+class GameClient:
+    """
+    GameClient(reader, writer) -> new GameClient object for the connected streams.
+    Use await GameClient.connect_tcp(host, port) or await GameClient.connect_unix(path).
+
+    GameClient keeps a local copy of the game state received from GameServer.
+
+    Attributes:
+    robot (index of the own robot or None), maze (list of lists of marks),
+    robots, monsters, status, tick.
+
+    Methods:
+    receive(), send(action), close().
+    """
+    def __init__(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter) -> None:
+        self.__reader = reader
+        self.__writer = writer
+        self.robot = None
+        self.maze = []
+        self.robots = []
+        self.monsters = []
+        self.status = None
+        self.tick = 0
+
+    @classmethod
+    async def connect_tcp(cls, host: str, port: int) -> GameClient:
+        client = cls(*await asyncio.open_connection(host, port))
+        await client.receive()
+        return client
+
+    @classmethod
+    async def connect_unix(cls, path: str) -> GameClient:
+        client = cls(*await asyncio.open_unix_connection(path))
+        await client.receive()
+        return client
+
+    async def receive(self) -> dict:
+        """Receive the next message from the server and apply it to the local state.
+        Return the message.
+        """
+        line = await self.__reader.readline()
+        if not line:
+            raise ConnectionError("connection closed by server")
+        message = json.loads(line)
+        self.tick = message["tick"]
+        if message["type"] == "snapshot":
+            self.robot = message["robot"]
+            self.maze = [[int(mark) for mark in row] for row in message["maze"]]
+            self.robots = message["robots"]
+            self.monsters = message["monsters"]
+            self.status = message["status"]
+            return message
+        for x, y, mark in message.get("cells", []):
+            self.maze[y][x] = mark
+        for i, state in message.get("robots", {}).items():
+            self.robots[int(i)] = state
+        for i, cell in message.get("monsters", {}).items():
+            self.monsters[int(i)] = cell
+        if "status" in message:
+            self.status = message["status"]
+        return message
+
+    async def send(self, action: str) -> None:
+        """Send the action ("left", "right", "up", "down", "stay" or "break") to the server."""
+        self.__writer.write(encode({"action": action}))
+        await self.__writer.drain()
+
+    async def close(self) -> None:
+        self.__writer.close()
+        await self.__writer.wait_closed()
+
+
+async def serve(width: int, height: int, host: str, port: int, robots: int) -> None:
+    server = GameServer(width, height, robots=robots)
+    host, port = await server.start_tcp(host, port)
+    print(f"TheWay server is listening on {host}:{port}")
+    await server.run()
+
+
+if __name__ == "__main__":
+    import argparse
+    parser = argparse.ArgumentParser(description="TheWay game server")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8765)
+    parser.add_argument("--width", type=int, default=41)
+    parser.add_argument("--height", type=int, default=25)
+    parser.add_argument("--robots", type=int, default=2)
+    args = parser.parse_args()
+    asyncio.run(serve(args.width, args.height, args.host, args.port, args.robots))
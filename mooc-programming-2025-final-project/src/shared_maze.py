@@ -0,0 +1,112 @@
+from __future__ import annotations
+#from typing import Self  # available from Python 3.11
+import os
+import sys
+from multiprocessing import resource_tracker
+from multiprocessing.shared_memory import SharedMemory
+
+
+# Process, where attach_segment() started the resource tracker (see attach_segment())
+_tracker_started_in = None
+
+
+def create_segment(size: int) -> SharedMemory:
+    """Create a new shared memory segment of size bytes. The creating process owns it:
+    the segment is removed by SharedMaze.close() or, if the process dies, by the resource tracker.
+    """
+    return SharedMemory(create=True, size=size)
+
+
+def attach_segment(name: str) -> SharedMemory:
+    """Attach the existing shared memory segment without taking its ownership."""
+    if sys.version_info >= (3, 13):
+        return SharedMemory(name=name, track=False)
+    # Before Python 3.13 attaching registers the segment with the resource tracker as if
+    # this process created it. A tracker inherited from the parent (e.g. the process pool
+    # of the owner) only gets the name again, but a tracker started by attaching
+    # would remove the segment when the worker exits: unregister it there.
+    # (Unregistering from the inherited tracker would drop the owner's registration.)
+    global _tracker_started_in
+    if resource_tracker._resource_tracker._fd is None:
+        _tracker_started_in = os.getpid()
+    segment = SharedMemory(name=name)
+    if _tracker_started_in == os.getpid():
+        resource_tracker.unregister(segment._name, "shared_memory")
+    return segment
+
+
+class SharedMaze:
+    """
+    SharedMaze -> handle of the maze grid placed into shared memory by Maze.share().
+
+    Pickling the handle (e.g. sending it to a process pool worker) costs the same for any size of the maze:
+    only the name of the shared memory segment, the dimensions and start_cell and finish_cell are pickled.
+    In the worker, attach() returns the Maze object reading the shared grid directly,
+    Maze.detach() releases it.
+
+    The handle returned by Maze.share() owns the segment: close() (or the end of the with-block)
+    moves the grid of the maze back into its own memory and removes the segment.
+    Workers must not use their attached mazes after that.
+
+    Attributes:
+    name, width, height, start_cell, finish_cell.
+
+    Methods:
+    attach(copy_on_write=False), close().
+    """
+    def __init__(self, name: str, width: int, height: int, start_cell: tuple | None,
+                 finish_cell: tuple | None, maze=None) -> None:
+        self.name = name
+        self.width = width
+        self.height = height
+        self.start_cell = start_cell
+        self.finish_cell = finish_cell
+        # The sharing Maze object, only in the owning process
+        self.__maze = maze
+
+    def __getstate__(self) -> tuple:
+        return self.name, self.width, self.height, self.start_cell, self.finish_cell
+
+    def __setstate__(self, state: tuple) -> None:
+        self.__init__(*state)
+
+    def __enter__(self) -> SharedMaze:
+        return self
+
+    def __exit__(self, *exc_info) -> None:
+        self.close()
+
+    def attach(self, copy_on_write: bool = False):
+        """Return the Maze object using the shared grid, see Maze.attach()."""
+        from maze import Maze
+        return Maze.attach(self, copy_on_write)
+
+    def close(self) -> None:
+        """In the owning process: stop sharing the maze and remove the segment. Elsewhere: do nothing."""
+        if self.__maze is not None:
+            self.__maze.unshare()
+            self.__maze = None
+
+
+def count_dead_ends(shared: SharedMaze) -> int:
+    """Example task for a worker: count the dead ends of the shared maze."""
+    maze = shared.attach()
+    try:
+        return len(maze.dead_ends())
+    finally:
+        maze.detach()
+
+
+if __name__ == "__main__":
+    import pickle
+    from concurrent.futures import ProcessPoolExecutor
+    from time import perf_counter
+    from maze import Maze
+
+    maze = Maze(1001, 1001, seed=1)
+    print(f"pickled Maze: {len(pickle.dumps(maze))} bytes")
+    with maze.share() as shared, ProcessPoolExecutor(2) as pool:
+        print(f"pickled SharedMaze: {len(pickle.dumps(shared))} bytes")
+        start = perf_counter()
+        counts = list(pool.map(count_dead_ends, [shared] * 4))
+        print(f"dead ends counted by the workers: {counts}, {perf_counter() - start:.2f} s")
@@ -0,0 +1,51 @@
+import os
+import subprocess
+import sys
+
+
+# Modules of the simulation core, which must be importable without pygame
+CORE_MODULES = ["maze", "graph", "moving_objects", "levels", "scheduler", "visibility", "vec_env", "journal"]
+
+# Maximum allowed import time of the core modules in seconds
+MAX_IMPORT_TIME = 0.05
+
+MEASURE = """
+import sys, time
+start = time.perf_counter()
+import {modules}
+elapsed = time.perf_counter() - start
+print(elapsed, "pygame" in sys.modules)
+"""
+
+
+def measure_import_time(modules: list = CORE_MODULES) -> tuple:
+    """Import the modules in a fresh interpreter started in the directory of this module.
+    Return tuple (import time in seconds, True if pygame got imported).
+    """
+    code = MEASURE.format(modules=", ".join(modules))
+    result = subprocess.run([sys.executable, "-c", code], capture_output=True, text=True, check=True,
+                            cwd=os.path.dirname(os.path.abspath(__file__)))
+    elapsed, pygame_imported = result.stdout.split()
+    return float(elapsed), pygame_imported == "True"
+
+
+def check_import_time(modules: list = CORE_MODULES, max_time: float = MAX_IMPORT_TIME) -> None:
+    """Raise AssertionError, if importing the modules takes more than max_time seconds
+    or imports pygame. The best of three runs is used, to ignore cold disk caches.
+    """
+    runs = [measure_import_time(modules) for _ in range(3)]
+    elapsed = min(run[0] for run in runs)
+    if any(run[1] for run in runs):
+        raise AssertionError(f"importing {modules} imports pygame")
+    if elapsed > max_time:
+        raise AssertionError(f"importing {modules} took {elapsed:.3f} s, allowed: {max_time} s")
+
+
+if __name__ == "__main__":
+    elapsed, pygame_imported = measure_import_time()
+    print(f"Core import time: {elapsed*1000:.1f} ms, pygame imported: {pygame_imported}")
+    try:
+        check_import_time()
+    except AssertionError as error:
+        print(error)
+        sys.exit(1)
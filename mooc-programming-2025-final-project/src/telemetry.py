@@ -0,0 +1,152 @@
+from __future__ import annotations
+#from typing import Self  # available from Python 3.11
+import json
+import queue
+import sqlite3
+import threading
+import time
+from array import array
+
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS sessions (
+    id INTEGER PRIMARY KEY, started REAL, seed INTEGER, levels INTEGER
+);
+CREATE TABLE IF NOT EXISTS events (
+    session INTEGER, time REAL, kind TEXT, level INTEGER, value REAL, data TEXT
+);
+CREATE INDEX IF NOT EXISTS events_kind ON events (session, level, kind, time);
+-- A level may be started several times in a session (restart, resume, zoom):
+-- every exit is paired with the latest level_start before it, the fastest attempt is reported.
+DROP VIEW IF EXISTS level_results;
+CREATE VIEW level_results AS
+SELECT session, level,
+       MIN(CASE WHEN kind = 'exit' THEN time - (
+           SELECT MAX(start.time) FROM events AS start
+           WHERE start.session = events.session AND start.level = events.level
+                 AND start.kind = 'level_start' AND start.time <= events.time) END) AS time_to_finish,
+       SUM(kind = 'coin') AS coins, SUM(kind = 'ram') AS rams_used, SUM(kind = 'death') AS deaths
+FROM events GROUP BY session, level;
+"""
+
+# Percentiles of the frame times reported at the end of the level
+PERCENTILES = {"p50": 0.5, "p95": 0.95, "p99": 0.99}
+
+
+class Telemetry:
+    """
+    Telemetry(path) -> new Telemetry object recording a new session into the SQLite database file path.
+    Telemetry(path, seed=S, levels=N) -> the same, the session is of the game with master seed S and N levels.
+
+    Telemetry collects gameplay events of one session: emit() only puts the event
+    into a bounded queue (if the queue is full, the event is dropped and counted in dropped),
+    a background thread writes the events into the database in batched transactions.
+
+    Events (kind: value):
+    level_start, exit (robot found the exit), coin: coins collected, ram: rams left,
+    death (robot met a monster), frame_times: frames (percentiles of the frame times in data).
+    The view level_results gives time to finish (of the fastest attempt), coins, rams used and deaths
+    per session and level.
+
+    Attributes:
+    level (current level, the default level of the events), dropped (amount of events dropped).
+
+    Methods:
+    emit(kind, value, level, **data), start_level(level), end_level(), frame_time(seconds), close().
+    """
+    def __init__(self, path: str, seed: int | None = None, levels: int | None = None,
+                 max_queue: int = 10000, batch_size: int = 500, flush_interval: float = 1.0) -> None:
+        self.path = path
+        self.level = None
+        self.dropped = 0
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self.__queue = queue.Queue(max_queue)
+        self.__frame_times = array('f')
+        self.__closed = threading.Event()
+        self.__writer = threading.Thread(target=self.__write_loop, args=(time.time(), seed, levels),
+                                         name="telemetry", daemon=True)
+        self.__writer.start()
+
+    def emit(self, kind: str, value: float | None = None, level: int | None = None, **data) -> None:
+        """Put the event into the queue, never wait: drop the event, if the queue is full."""
+        try:
+            self.__queue.put_nowait((time.time(), kind, self.level if level is None else level, value,
+                                     data or None))
+        except queue.Full:
+            self.dropped += 1
+
+    def frame_time(self, seconds: float) -> None:
+        """Remember the time of one frame (reported as percentiles at the end of the level)."""
+        self.__frame_times.append(seconds)
+
+    def end_level(self) -> None:
+        """Report the frame times of the current level (if any frames were remembered)."""
+        if self.__frame_times:
+            # Percentiles are computed by the writer thread
+            frame_times, self.__frame_times = self.__frame_times, array('f')
+            self.emit("frame_times", len(frame_times), frame_times=frame_times)
+
+    def start_level(self, level: int) -> None:
+        """End the current level (see end_level()) and emit level_start of the level."""
+        self.end_level()
+        self.level = level
+        self.emit("level_start")
+
+    def __write_loop(self, started: float, seed: int | None, levels: int | None) -> None:
+        connection = sqlite3.connect(self.path)
+        with connection:
+            connection.executescript(SCHEMA)
+            # SQLite integers are signed 64-bit
+            if seed is not None and seed >= 1 << 63:
+                seed -= 1 << 64
+            session = connection.execute("INSERT INTO sessions (started, seed, levels) VALUES (?, ?, ?)",
+                                         (started, seed, levels)).lastrowid
+        batch = []
+        deadline = time.monotonic() + self.flush_interval
+        while True:
+            try:
+                event = self.__queue.get(timeout=max(0, deadline - time.monotonic()))
+                # None only wakes the thread up (see close())
+                if event is not None:
+                    batch.append(self.__row(session, *event))
+            except queue.Empty:
+                pass
+            closed = self.__closed.is_set() and self.__queue.empty()
+            if len(batch) >= self.batch_size or time.monotonic() >= deadline or closed:
+                if batch:
+                    with connection:
+                        connection.executemany("INSERT INTO events VALUES (?, ?, ?, ?, ?, ?)", batch)
+                    batch = []
+                deadline = time.monotonic() + self.flush_interval
+            if closed:
+                connection.close()
+                return
+
+    @staticmethod
+    def __row(session: int, moment: float, kind: str, level: int | None, value: float | None,
+              data: dict | None) -> tuple:
+        if data is not None and "frame_times" in data:
+            frame_times = sorted(data.pop("frame_times"))
+            for name, fraction in PERCENTILES.items():
+                data[name] = frame_times[min(len(frame_times) - 1, int(fraction * len(frame_times)))]
+            data["max"] = frame_times[-1]
+        return session, moment, kind, level, value, None if data is None else json.dumps(data)
+
+    def close(self) -> None:
+        """End the current level, write all the events left in the queue and stop the writer thread."""
+        self.end_level()
+        self.__closed.set()
+        try:
+            self.__queue.put_nowait(None)
+        except queue.Full:
+            pass
+        self.__writer.join()
+
+
+if __name__ == "__main__":
+    import sys
+    # Print the results of the levels from the database file given as the argument
+    connection = sqlite3.connect(sys.argv[1] if len(sys.argv) > 1 else "telemetry.sqlite")
+    for row in connection.execute("SELECT * FROM level_results ORDER BY session, level"):
+        print(row)
@@ -1,13 +1,47 @@
 import pygame
+from time import perf_counter
 from maze import Maze
 from moving_objects import Robot, Monster
+from controls import RobotControls, allow_game_events
 from levels import Levels
+from scheduler import MonsterScheduler
+from visibility import FieldOfView
+from diagnostics import AllocationTracker
+from atlas import SpriteAtlas
+from journal import Journal, GameState, read_journal
+from renderer import TileRenderer
+from telemetry import Telemetry
+
+
+# The game is simulated in fixed ticks, whatever the frame rate: robot moves by at most one cell per tick,
+# monsters every MONSTER_INTERVAL ticks. Between their moves, the frames show robot and monsters
+# on the way from their previous cells to the current ones (see TheWay.moving_objects()).
+TICK_RATE = 30
+MONSTER_INTERVAL = 15
+# If the frames are late, at most this amount of ticks is run per frame (the game slows down instead)
+MAX_TICKS_PER_FRAME = 5
 
 
 class TheWay:
     """
     TheWay() -> new TheWay game with 1 level.
     TheWay(levels_amount=N) -> new TheWay game with N levels.
+    TheWay(levels_amount=None) -> new endless TheWay game.
+    TheWay(levels_amount=N, start_level=K, seed=S) -> new TheWay game starting from level K
+    of the levels generated from the master seed S.
+    TheWay(levels_amount=N, fog_of_war=True) -> new TheWay game, where only the cells
+    in robot's line of sight are shown (and walls seen before).
+    TheWay(levels_amount=N, track_allocations=True) -> new TheWay game in diagnostics mode:
+    allocations of every frame are tracked by subsystem and reported once per second.
+    TheWay(levels_amount=N, zoom=Z) -> new TheWay game with the images scaled by Z
+    (the nearest zoom level of the sprite atlas, F4 switches the zoom level during the game).
+    TheWay(levels_amount=N, journal_path=P) -> new TheWay game saved continuously into the journal file P.
+    TheWay(levels_amount=N, journal_path=P, resume=True) -> the game saved in the journal file P
+    continued (a new game, if nothing is saved there).
+    TheWay(levels_amount=N, telemetry_path=P) -> new TheWay game recording gameplay events and frame times
+    into the SQLite database file P (see telemetry.Telemetry).
+    TheWay(levels_amount=N, frame_rate=F) -> new TheWay game drawn at most F frames per second
+    (0 for no limit), the game itself runs at TICK_RATE ticks per second anyway.
 
     TheWay is an arcade game, which idea is to find the exit in 
     the maze using the keyboard to control the robot movements.
@@ -18,10 +52,31 @@ class TheWay:
 
     The game has only fullscreen mode.
     """
-    def __init__(self, levels_amount: int = 1) -> None:
+    def __init__(self, levels_amount: int | None = 1, start_level: int = 1, seed=None,
+                 fog_of_war: bool = False, track_allocations: bool = False, zoom: float = 1,
+                 journal_path: str | None = None, resume: bool = False, telemetry_path: str | None = None,
+                 frame_rate: int = 60) -> None:
         pygame.init()
+        self.frame_rate = frame_rate
         self.levels_amount = levels_amount
+        self.start_level = start_level
+        self.seed = seed
+        self.fog_of_war = fog_of_war
+        self.fov = None
+        self.renderer = None
+        self.message = None
+        self.tick_number = 0
+        self.journal_path = journal_path
+        self.resume = resume
+        self.journal = None
+        self.telemetry_path = telemetry_path
+        self.telemetry = None
+        self.allocation_tracker = AllocationTracker() if track_allocations else None
         self.window = pygame.display.set_mode(flags=pygame.FULLSCREEN)
+        allow_game_events()
+        self.atlas = SpriteAtlas()
+        self.zoom = self.atlas.nearest_zoom(zoom)
+        self.controls = RobotControls()
         self.game_font = pygame.font.SysFont("Arial", 24)
         self.game_font_big = pygame.font.SysFont("Arial", 48)
         self.clock = pygame.time.Clock()
@@ -42,32 +97,13 @@ class TheWay:
         self.maze_columns = self.width//self.square_size
         self.maze_rows = self.height//self.square_size - 1
 
-    def __create_wall_image(self, color: pygame.color.Color) -> pygame.surface.Surface:
-        """Draw the square image of a wall brick. Return pygame object.
-        """
-        size = self.square_size
-        wall = pygame.Surface((size, size))
-        wall.fill(color)
-        brick_points = [(8, 6), (4, 18), (4, size-16), (6, size-8), (size-6, size-4),
-                        (size-4, size-6), (size-4, 6), (size-6, 4)]
-        pygame.draw.polygon(wall, (100, 30, 30), brick_points)
-        return wall
-
-    def __load_images(self, image_names: list) -> None:
-        """Load images from the given list. 
-        (Images should exist in the workind dir with .png extension.)
-        Save them to self.images dictionary, use image name as key.
-        Set the size of the square building block based on the robot image.
+    def __select_images(self) -> None:
+        """Select the images of the current zoom level from the sprite atlas
+        into self.images dictionary, use image name as key.
+        Set the size of the square building block of that zoom level.
         """
-        self.images = {}
-        for name in image_names:
-            self.images[name] = pygame.image.load(name + '.png')
-
-        # Set the size of the square building block
-        self.square_size = self.images["robot"].get_height() + 4
-
-        # Add image of wall brick
-        self.images["wall"] = self.__create_wall_image(pygame.Color("black"))
+        self.images = dict(self.atlas.images(self.zoom))
+        self.square_size = self.atlas.square_size(self.zoom)
 
     def __set_margins(self) -> None:
         """After the Maze() is initialized, the dimensions of the maze might be changed
@@ -82,32 +118,14 @@ class TheWay:
         # Set y coordinate for instructions line
         self.instructions_y_coord = self.height-(self.square_size/2)-self.y_margin
 
-    def new_maze(self, robots: int = 1, doors: int = 1, monsters: int = 2, coins: int = 10) -> None:
+    def new_maze(self, robots: int = 1, doors: int = 1, monsters: int = 2, coins: int = 10, seed=None) -> None:
         """Create a Maze object with the dimensions self.maze_columns and self.maze_rows.
         Put robot(s), door(s), monster(s) and coin(s) into the maze.
         """
-        self.maze = Maze(self.maze_columns, self.maze_rows)
-
-        # At least one robot is put into the maze.
-        # The first one robot is put into the start_cell of the maze.
-        self.maze.mark_cell(self.maze.start_cell, self.maze.robot)
-        # Put more robots into the maze onto the random places, if there are more than one robot.
-        for _ in range(robots-1):
-            self.maze.mark_cell(self.maze.pick_random_cell(self.maze.path), self.maze.robot)
-        
-        # At least one door(exit) is put into the maze.
-        # The first one door is put into the finish_cell of the maze.
-        self.maze.mark_cell(self.maze.finish_cell, self.maze.door)
-        # Put more doors into the maze randomly, if there are more than one door.
-        for _ in range(doors-1):
-            self.maze.mark_cell(self.maze.pick_random_cell(self.maze.path), self.maze.door)
-
-        # Put monsters into the maze onto the random places.
-        for _ in range(monsters):
-            self.maze.mark_cell(self.maze.pick_random_cell(self.maze.path), self.maze.monster)
-        # Put coins into the maze onto the random places.
-        for _ in range(coins):
-            self.maze.mark_cell(self.maze.pick_random_cell(self.maze.path), self.maze.coin)
+        self.maze = Maze(self.maze_columns, self.maze_rows, seed=seed)
+        # The first robot is put into the start_cell, the first door(exit) into the finish_cell of the maze,
+        # more robots and doors, monsters and coins onto the random places.
+        self.maze.populate(robots=robots, doors=doors, monsters=monsters, coins=coins)
 
     def map_maze_marks_to_images(self) -> None:
         """Map image objects in self.images to the marks of the self.maze.
@@ -118,16 +136,195 @@ class TheWay:
     def new_game(self, level: dict) -> None:
         """Prepare for a new game according to the given level.
         """
-        self.__load_images(["door", "coin", "robot", "monster"])
+        self.__select_images()
         self.__set_sizes()
-        self.new_maze(monsters=level['monsters'], coins=level['coins'])
+        self.new_maze(monsters=level['monsters'], coins=level['coins'], seed=level['seed'])
         self.__set_margins()
         self.map_maze_marks_to_images()
-        self.hide_doors()
+        self.hidden_doors = self.maze.hide_doors()
 
-        self.robot = Robot(self.maze, self.maze.start_cell, rams=level['rams'])
+        self.robot = Robot(self.maze, self.maze.start_cell, rams=level['rams'], telemetry=self.telemetry)
+        self.controls.robot = self.robot
+        self.controls.release_all()
         monster_cells = self.maze.find_cells_by_mark(self.maze.monster)
         self.monsters = [Monster(self.maze, monster_cell) for monster_cell in monster_cells]
+        self.monster_scheduler = MonsterScheduler(self.monsters, interval=MONSTER_INTERVAL)
+        self.start_motions()
+        self.new_fov()
+        self.new_renderer()
+        if self.telemetry:
+            self.telemetry.start_level(self.level['level'])
+        # Remember the initial state of the level for restart_game()
+        self.initial_state = (self.maze.snapshot(), self.hidden_doors[:], monster_cells)
+        if self.journal:
+            self.journal.record_level(level)
+            self.journal.attach(self.maze)
+            self.save_checkpoint()
+
+    def resume_game(self, state: GameState) -> None:
+        """Continue the game from the state read from the journal (see journal.read_journal()).
+        """
+        self.levels_amount = state.levels[0]
+        self.levels = Levels(amount=state.levels[0], seed=state.levels[1])
+        self.level = state.level
+        self.zoom = self.atlas.nearest_zoom(state.zoom)
+        self.__select_images()
+        self.__set_sizes()
+        self.maze = state.new_maze()
+        self.__set_margins()
+        self.map_maze_marks_to_images()
+        self.initial_state = state.initial
+
+        # The doors put into the maze after the checkpoint are not hidden any more
+        door = self.maze.door
+        overlapped_doors = [cell for _, _, overlapped in state.monsters
+                            for cell, mark in overlapped.items() if mark == door]
+        self.hidden_doors = [cell for cell in state.hidden_doors
+                             if not self.maze.check_mark(cell, door) and cell not in overlapped_doors]
+
+        x, y, rams, coins = state.robot
+        self.robot = Robot(self.maze, (x, y), rams=rams, coins=coins, telemetry=self.telemetry)
+        self.controls.robot = self.robot
+        self.controls.release_all()
+        self.monsters = []
+        for x, y, overlapped in state.monsters:
+            monster = Monster(self.maze, (x, y))
+            monster.overlapped = dict(overlapped)
+            self.monsters.append(monster)
+        self.monster_scheduler = MonsterScheduler(self.monsters, interval=MONSTER_INTERVAL)
+        self.start_motions()
+        self.new_fov()
+        self.new_renderer()
+        if self.telemetry:
+            self.telemetry.start_level(self.level['level'])
+        # Robot saved in the cell of a door, which is not hidden, has passed the level
+        robot_cell = self.robot.cell
+        if robot_cell in state.initial[1] and robot_cell not in self.hidden_doors:
+            self.update_objects_game_status("passed")
+        if self.journal:
+            self.journal.attach(self.maze)
+            self.save_checkpoint()
+
+    def game_state(self) -> GameState:
+        """Return the current state of the game to be saved into the journal."""
+        state = GameState(self.level, self.maze.width, self.maze.height)
+        state.levels = (self.levels.amount, self.levels.seed)
+        state.zoom = self.zoom
+        state.maze[:] = self.maze.snapshot()
+        state.initial = self.initial_state
+        state.hidden_doors = self.hidden_doors[:]
+        state.robot = (self.robot.cell[0], self.robot.cell[1], self.robot.rams, self.robot.coins)
+        state.monsters = [(*monster.cell, dict(monster.overlapped)) for monster in self.monsters]
+        return state
+
+    def save_checkpoint(self) -> None:
+        """Write the whole state of the game into the journal (if the game is saved)."""
+        if self.journal:
+            self.journal.checkpoint(self.game_state())
+
+    def quit(self) -> None:
+        """Write everything left into the journal and the telemetry database and exit."""
+        if self.journal:
+            self.journal.close()
+        if self.telemetry:
+            self.telemetry.close()
+        exit()
+
+    def new_renderer(self) -> None:
+        """Create a new renderer of the current maze (see renderer.TileRenderer),
+        if fog of war is off: with the field of view the maze is drawn by draw_fog_of_war()
+        (so new_fov() must be called first).
+        """
+        if self.renderer:
+            self.renderer.close()
+            self.renderer = None
+        if self.fov:
+            return
+        self.renderer = TileRenderer(self.maze, self.marked_images, self.square_size, pygame.Color("gray40"),
+                                     moving_marks=(self.maze.robot, self.maze.monster))
+
+    def moving_cells(self) -> list:
+        """Return the list of the current cells of robot and monsters."""
+        return [self.robot.cell] + [monster.cell for monster in self.monsters]
+
+    def start_motions(self) -> None:
+        """Forget the moves of robot and monsters: they are drawn standing in their cells.
+        Motion of an object is [from cell, to cell, tick of the move, duration in ticks] (see moving_objects()).
+        """
+        self.motions = [[cell, cell, self.tick_number, 1] for cell in self.moving_cells()]
+
+    def track_motions(self) -> None:
+        """After the tick: start the motion of every object moved during the tick from its previous cell.
+        The motion lasts as long as the object waited before the move (a monster moves every
+        MONSTER_INTERVAL ticks or less often, a held key moves robot every repeat interval),
+        but not longer than the longest interval of the object.
+        """
+        limits = ([max(self.controls.repeat_interval * TICK_RATE, 1)]
+                  + [MONSTER_INTERVAL * self.monster_scheduler.far_factor] * len(self.monsters))
+        for motion, cell, limit in zip(self.motions, self.moving_cells(), limits):
+            if cell != motion[1]:
+                motion[:] = [motion[1], cell, self.tick_number, min(self.tick_number - motion[2], limit)]
+
+    def moving_objects(self, alpha: float) -> list:
+        """Return the list of (mark, (x, y)) of robot and monsters, where (x, y) is the position
+        on the way of the object's motion alpha (0..1) of a tick after the last tick
+        (fractional, while the object is between the cells).
+        """
+        marks = [self.maze.robot] + [self.maze.monster] * len(self.monsters)
+        sprites = []
+        for mark, ((x0, y0), (x1, y1), tick, duration) in zip(marks, self.motions):
+            progress = min((self.tick_number - tick + alpha) / duration, 1)
+            sprites.append((mark, (x0 + (x1 - x0)*progress, y0 + (y1 - y0)*progress)))
+        return sprites
+
+    def new_fov(self) -> None:
+        """Create a new field of view for the current maze, if fog of war is on."""
+        if self.fov:
+            self.fov.close()
+        self.fov = FieldOfView(self.maze) if self.fog_of_war else None
+
+    def next_zoom(self) -> None:
+        """Switch to the next zoom level of the sprite atlas (after the largest one, to the smallest).
+        The current maze is kept and drawn with the squares of the new size.
+        Only if it does not fit the screen any more, the current level is started again
+        with a maze generated for the new size of the squares (and the player is told so).
+        """
+        zooms = self.atlas.zooms
+        self.zoom = zooms[(zooms.index(self.zoom) + 1) % len(zooms)]
+        self.__select_images()
+        self.__set_sizes()
+        if self.maze.width > self.maze_columns or self.maze.height > self.maze_rows:
+            self.update_objects_game_status(None)
+            self.new_game(self.level)
+            self.show_message("The maze does not fit the screen: the level starts again with a new maze.")
+            return
+        self.__set_margins()
+        self.map_maze_marks_to_images()
+        self.new_renderer()
+
+    def show_message(self, text: str, seconds: float = 3) -> None:
+        """Show the text on the screen for the given amount of seconds (see draw_message_text())."""
+        self.message = (text, pygame.time.get_ticks() + seconds*1000)
+
+    def restart_game(self) -> None:
+        """Restart the current level: put the maze, doors, robot and monsters 
+        back into the state saved by new_game(). The maze is not generated again.
+        """
+        maze_snapshot, hidden_doors, monster_cells = self.initial_state
+        self.maze.restore(maze_snapshot)
+        self.hidden_doors = hidden_doors[:]
+        self.robot = Robot(self.maze, self.maze.start_cell, rams=self.level['rams'], telemetry=self.telemetry)
+        self.controls.robot = self.robot
+        self.controls.release_all()
+        self.monsters = [Monster(self.maze, monster_cell) for monster_cell in monster_cells]
+        self.monster_scheduler = MonsterScheduler(self.monsters, interval=MONSTER_INTERVAL)
+        self.start_motions()
+        self.new_fov()
+        self.new_renderer()
+        if self.telemetry:
+            self.telemetry.start_level(self.level['level'])
+        # Maze.restore() does not call mark_cell(): save the whole state
+        self.save_checkpoint()
     
     def update_objects_game_status(self, status: str) -> None:
         """Update game status in all moving objects.
@@ -143,11 +340,16 @@ class TheWay:
         """
         for monster in self.monsters:
             if monster.game_status == "gameover":
+                if self.telemetry and self.robot.game_status != "gameover":
+                    self.telemetry.emit("death")
                 # Update game statuses of all moving objects for consistency
                 # (objects do not move, if game is passed or over)
                 self.update_objects_game_status("gameover")
                 return True
         if self.robot.game_status == "gameover":
+            # Robot walked into a monster
+            if self.telemetry and any(monster.game_status != "gameover" for monster in self.monsters):
+                self.telemetry.emit("death")
             self.update_objects_game_status("gameover")
             return True
         return False
@@ -168,29 +370,10 @@ class TheWay:
         """If game is passed, return True, else False.
         Game is passed if the last level is passed.
         """
-        if self.level_passed() and self.level["level"] == self.levels_amount:
+        if self.level_passed() and self.levels_amount is not None and self.level["level"] == self.levels_amount:
             return True
         return False
 
-    def hide_doors(self) -> None:
-        """Save the coordinates of cells containing doors into self.hidden_doors,
-        remove the doors from the maze (mark cells with doors as paths).
-        """
-        self.hidden_doors = self.maze.find_cells_by_mark(self.maze.door)
-        for cell in self.hidden_doors:
-            self.maze.mark_cell(cell, self.maze.path)
-
-    def unhide_doors(self) -> None:
-        """Put the doors into the maze (mark cells in maze by coordinates from self.hidden_doors as doors), 
-        remove from self.hidden_doors accordingly.
-        """
-        for cell in self.hidden_doors:
-            # If cell is occupied by monster, do nothing
-            if self.maze.check_mark(cell, self.maze.monster):
-                return
-            self.maze.mark_cell(cell, self.maze.door)
-            self.hidden_doors.remove(cell)
-
     def process_doors(self) -> None:
         """If all coins collected by robot, unhide the doors.
         """
@@ -206,7 +389,7 @@ class TheWay:
             if len(found) > 0:
                 return
             
-        self.unhide_doors()
+        self.maze.unhide_doors(self.hidden_doors)
 
     def instructions_loop(self) -> None:
         """Draw window with instructions and wait until user pushes button to start.
@@ -216,7 +399,7 @@ class TheWay:
             for event in pygame.event.get():
                 if event.type == pygame.KEYDOWN:
                     if event.key == pygame.K_ESCAPE:
-                        exit()
+                        self.quit()
                     if event.key == pygame.K_F2:
                         return
 
@@ -225,64 +408,106 @@ class TheWay:
         create Levels object, prepare the new game for the given level,
         show instructions and wait until user decides to start.
         In main loop:
-        process doors (hide/unhide), move monsters, draw the window,
-        check events.
-        """
-        levels = Levels(amount=self.levels_amount)
-        # Get iterator from the Levels object,
-        # to be able further to get the next value from it one by one
-        self.iter_levels = iter(levels)
-        self.level = next(self.iter_levels)
-        self.new_game(self.level)
+        check events, run the ticks due since the last frame (process doors (hide/unhide),
+        move monsters and robot), draw the window.
+        """
+        self.levels = Levels(amount=self.levels_amount, seed=self.seed)
+        state = read_journal(self.journal_path) if self.journal_path and self.resume else None
+        if self.telemetry_path:
+            # The resumed game continues the levels saved in the journal (see resume_game())
+            levels = self.levels if state is None else Levels(amount=state.levels[0], seed=state.levels[1])
+            self.telemetry = Telemetry(self.telemetry_path, seed=levels.seed, levels=levels.amount)
+        if self.journal_path:
+            self.journal = Journal(self.journal_path, append=state is not None)
+        if state is None:
+            self.level = self.levels[self.start_level]
+            self.new_game(self.level)
+        else:
+            self.resume_game(state)
         self.instructions_loop()
         
+        frame_number = 0
+        tick = 1 / TICK_RATE
+        # Time not yet simulated (less than one tick, unless the frames are late)
+        lag = 0.0
+        last_time = perf_counter()
         while True:
-            self.process_doors()
-            for monster in self.monsters:
-                monster.move_monster()
-            self.draw_window()
-            self.check_events()
-            self.clock.tick(60)
+            frame_start = perf_counter()
+            lag += frame_start - last_time
+            last_time = frame_start
+            ticks = min(int(lag / tick), MAX_TICKS_PER_FRAME)
+            lag = min(lag - ticks*tick, tick)
+            if self.allocation_tracker:
+                with self.allocation_tracker.frame() as allocations:
+                    self.run_frame(ticks, lag / tick)
+                frame_number += 1
+                if frame_number % 60 == 0:
+                    print(f"Frame {frame_number} allocations:\n{allocations}")
+            else:
+                self.run_frame(ticks, lag / tick)
+            if self.telemetry:
+                self.telemetry.frame_time(perf_counter() - frame_start)
+            self.clock.tick(self.frame_rate)
+
+    def run_frame(self, ticks: int = 1, alpha: float = 1) -> None:
+        """Check events, run the given amount of ticks (see run_tick()) and draw the window
+        alpha (0..1) of a tick after the last tick (see moving_objects()).
+        """
+        self.check_events()
+        # All the ticks of the frame share one time budget for monsters
+        deadline = self.monster_scheduler.deadline()
+        for _ in range(ticks):
+            self.run_tick(deadline)
+        self.draw_window(alpha)
+
+    def run_tick(self, deadline: float | None = None) -> None:
+        """Process doors, move monsters (until the deadline, see MonsterScheduler.update()), move robot,
+        start the motions of the moved objects (see track_motions()),
+        record the moves into the journal (if the game is saved).
+        """
+        self.tick_number += 1
+        self.process_doors()
+        self.monster_scheduler.update(self.robot.cell, deadline)
+        self.controls.update(1 / TICK_RATE)
+        self.track_motions()
+        if self.journal:
+            self.journal.record_robot(self.robot)
+            self.journal.record_monsters(self.monsters)
+            if self.journal.checkpoint_due():
+                self.save_checkpoint()
 
     def check_events(self) -> None:
         """Check events received by pygame.
         Escape button for exit.
         F2 button for restart the current level.
         F3 button for next level.
+        F4 button for the next zoom level.
         """
         for event in pygame.event.get():
-            self.robot.process_event(event)
+            if event.type == pygame.QUIT:
+                self.quit()
+            self.controls.process_event(event)
             
             if event.type == pygame.KEYDOWN:
                 if event.key == pygame.K_ESCAPE:
-                    exit()
+                    self.quit()
                 # If F2 pushed: restart the game on the same level
                 if event.key == pygame.K_F2:
-                    self.new_game(self.level)
+                    self.restart_game()
                 # If level passed, game not passed and F3 pushed: go to the next level
                 if self.level_passed() and not self.game_passed() and event.key == pygame.K_F3:
                     # Set game status to None
                     self.update_objects_game_status(None)
                     # Get the next level
-                    self.level = next(self.iter_levels)
+                    self.level = self.levels[self.level['level'] + 1]
                     self.new_game(self.level)
+                # If F4 pushed: switch to the next zoom level
+                if event.key == pygame.K_F4:
+                    self.next_zoom()
 
-    def draw_maze_background(self, color: pygame.color.Color) -> None:
-        """Create image of maze background inside the horizontal and vertical outer walls.
-        Draw the image onto the game window.
-        """
-        width = self.square_size * (self.maze.width - 2)
-        height = self.square_size * (self.maze.height - 2)
-        maze_background = pygame.Surface((width, height))
-        maze_background.fill(color)
-        # Find coordinates where to draw the image: upper left corner inside the maze walls.
-        # To not forget the margins.
-        x = self.x_margin + self.square_size
-        y = self.y_margin + self.square_size
-        self.window.blit(maze_background, (x, y))
-            
-    def draw_window(self) -> None:
-        """Draw the game window according to the game status.
+    def draw_window(self, alpha: float = 1) -> None:
+        """Draw the game window according to the game status,
+        robot and monsters on their way alpha (0..1) of a tick after the last tick (see moving_objects()).
         """
         self.window.fill(pygame.Color("black"))
         
@@ -301,13 +526,48 @@ class TheWay:
             pygame.display.flip()
             return
         
-        self.draw_maze_background(pygame.Color("gray40"))
-        
-        for mark, cell in self.maze:
-            self.draw_cell(cell, mark)
+        sprites = self.moving_objects(alpha)
+        if self.fov:
+            self.draw_fog_of_war(pygame.Color("gray40"), pygame.Color("gray15"), sprites)
+        else:
+            self.renderer.draw(self.window, (self.x_margin, self.y_margin), sprites)
         self.draw_info_text()
         pygame.display.flip()
 
+    def draw_fog_of_war(self, visible_color: pygame.color.Color, remembered_color: pygame.color.Color,
+                        sprites: list = ()) -> None:
+        """Draw only the cells visible by robot and walls of the cells remembered
+        (visible earlier), the rest of the maze stays black.
+        Then draw the sprites [(mark, (x, y))] of robot and monsters (see moving_objects()),
+        which are in the visible cells.
+        """
+        visible = self.fov.visible(self.robot.cell)
+        wall = self.maze.wall
+        moving_marks = (self.maze.robot, self.maze.monster)
+        for x, y in self.fov.remembered:
+            if (x, y) in visible:
+                continue
+            mark = self.maze.maze[y][x]
+            if mark == wall:
+                self.draw_cell((x, y), mark)
+            else:
+                self.draw_square((x, y), remembered_color)
+        for x, y in visible:
+            mark = self.maze.maze[y][x]
+            if mark != wall:
+                self.draw_square((x, y), visible_color)
+            if mark not in moving_marks:
+                self.draw_cell((x, y), mark)
+        for mark, (x, y) in sprites:
+            if (round(x), round(y)) in visible:
+                self.draw_cell((x, y), mark)
+
+    def draw_square(self, cell: tuple, color: pygame.color.Color) -> None:
+        """Fill the square of the cell with the color."""
+        x = cell[0] * self.square_size + self.x_margin
+        y = cell[1] * self.square_size + self.y_margin
+        self.window.fill(color, (x, y, self.square_size, self.square_size))
+
     def draw_instructions_window(self) -> None:
         """Draw the window with instructions on how to play the game.
         """
@@ -316,6 +576,7 @@ class TheWay:
                         "Avoid monsters.", "", 
                         "Use rams to break the wall:", 
                         "while moving press SPACE button to break the wall.", "",
+                        "Press F4 to change the zoom.", "",
                         "GOOD LUCK!", "", "",
                         "Press F2 to start."]
 
@@ -356,6 +617,20 @@ class TheWay:
         self.draw_controls_text()
         self.draw_rams_text()
         self.draw_coins_text()
+        self.draw_message_text()
+
+    def draw_message_text(self) -> None:
+        """Draw the message of show_message() in the middle of the screen, until its time is over.
+        (pygame.display.flip() must be executed subsequently).
+        """
+        if self.message is None:
+            return
+        text, until = self.message
+        if pygame.time.get_ticks() > until:
+            self.message = None
+            return
+        message_text = self.game_font.render(text, True, (255, 255, 0))
+        self.window.blit(message_text, (self.width/2-message_text.get_width()/2, self.height/2))
 
     def draw_gameover_text(self) -> None:
         """Draw texts when game is over.
@@ -411,8 +686,7 @@ class TheWay:
     def draw_controls_text(self) -> None:
         """Draw text about how to control robot.
         """
-        controls_str = f"Left:  j{' '*5}Right:  l{' '*5}Up:  i{' '*5}Down:  k{' '*5}Break wall: Space"
-        controls_text = self.game_font.render(controls_str, True, (0, 255, 0))
+        controls_text = self.game_font.render(self.controls.describe(), True, (0, 255, 0))
         self.window.blit(controls_text, (self.x_margin + 600, self.instructions_y_coord))
 
     def draw_coins_text(self) -> None:
@@ -0,0 +1,176 @@
+from __future__ import annotations
+#from typing import Self  # available from Python 3.11
+import random
+from array import array
+from maze import Maze
+from moving_objects import Robot, Monster
+
+
+# Actions: index -> (left, right, up, down, break wall)
+ACTIONS = [
+    (False, False, False, False, False), # 0: stay
+    (True, False, False, False, False),  # 1: left
+    (False, True, False, False, False),  # 2: right
+    (False, False, True, False, False),  # 3: up
+    (False, False, False, True, False),  # 4: down
+    (True, False, False, False, True),   # 5: break wall to the left
+    (False, True, False, False, True),   # 6: break wall to the right
+    (False, False, True, False, True),   # 7: break wall above
+    (False, False, False, True, True),   # 8: break wall below
+]
+
+# Observation of one game: robot x, robot y, coins, rams,
+# marks of the cells to the left, right, above and below the robot.
+OBSERVATION_SIZE = 8
+
+
+class VecTheWay:
+    """
+    VecTheWay(num_envs, width, height) -> new VecTheWay object with num_envs independent games.
+    VecTheWay(num_envs, width, height, monsters=M, coins=C, rams=R, seed=S) -> the same with
+    the given amount of monsters, coins and rams per game and seeded random generator.
+
+    VecTheWay runs many games of TheWay in one process without any window.
+    Every game has its own Maze, Robot and Monster objects; the state visible
+    to the caller is kept in flat arrays stacked game by game, so all the games
+    are advanced by one step() call.
+
+    Public attributes:
+    num_envs, observations (array of num_envs*OBSERVATION_SIZE floats),
+    rewards (array of num_envs floats), dones (bytearray of num_envs flags).
+
+    Methods:
+    reset(), step(actions).
+
+    Action of a game is an index in ACTIONS. A game which is over (passed or gameover)
+    is reset automatically during step(), its observation belongs then to the new game.
+    The arrays returned by reset() and step() are reused by the next call.
+    """
+    REWARD_COIN = 1.0
+    REWARD_PASSED = 10.0
+    REWARD_GAMEOVER = -10.0
+
+    def __init__(self, num_envs: int, width: int, height: int, monsters: int = 2,
+                 coins: int = 10, rams: int = 2, max_steps: int | None = None, seed=None) -> None:
+        if num_envs < 1:
+            raise ValueError(f"num_envs must be >= 1, given: {num_envs}")
+        self.num_envs = num_envs
+        self.width = width
+        self.height = height
+        self.monsters_amount = monsters
+        self.coins_amount = coins
+        self.rams_amount = rams
+        self.max_steps = max_steps
+        # Own generator: seeding does not touch the module random used elsewhere in the process
+        self.__random = random.Random(seed)
+
+        self.observations = array('d', bytes(8 * num_envs * OBSERVATION_SIZE))
+        self.rewards = array('d', bytes(8 * num_envs))
+        self.dones = bytearray(num_envs)
+
+        self.__mazes = [None] * num_envs
+        self.__robots = [None] * num_envs
+        self.__monsters = [None] * num_envs
+        self.__hidden_doors = [None] * num_envs
+        self.__coins_total = [0] * num_envs
+        self.__steps = [0] * num_envs
+
+    def __new_game(self, i: int) -> None:
+        """Create a new maze with robot, door, monsters and coins for the game i."""
+        maze = Maze(self.width, self.height, seed=self.__random.getrandbits(64))
+        # The door is hidden until all coins are collected
+        _, _, monster_cells, coin_cells = maze.populate(monsters=self.monsters_amount, coins=self.coins_amount)
+        hidden_doors = maze.hide_doors()
+
+        self.__mazes[i] = maze
+        self.__robots[i] = Robot(maze, maze.start_cell, rams=self.rams_amount)
+        self.__monsters[i] = [Monster(maze, cell, rng=self.__random) for cell in monster_cells]
+        self.__hidden_doors[i] = hidden_doors
+        self.__coins_total[i] = len(coin_cells)
+        self.__steps[i] = 0
+
+    def __observe(self, i: int) -> None:
+        """Write the observation of the game i into self.observations."""
+        maze = self.__mazes[i]
+        robot = self.__robots[i]
+        x, y = robot.cell
+        offset = i * OBSERVATION_SIZE
+        obs = self.observations
+        obs[offset] = x
+        obs[offset+1] = y
+        obs[offset+2] = robot.coins
+        obs[offset+3] = robot.rams
+        obs[offset+4] = maze.maze[y][x-1]
+        obs[offset+5] = maze.maze[y][x+1]
+        obs[offset+6] = maze.maze[y-1][x]
+        obs[offset+7] = maze.maze[y+1][x]
+
+    def __process_doors(self, i: int) -> None:
+        """Unhide the door of the game i, if all coins are collected by robot.
+        A door occupied by a monster stays hidden until the monster goes away.
+        """
+        hidden_doors = self.__hidden_doors[i]
+        if hidden_doors and self.__robots[i].coins >= self.__coins_total[i]:
+            self.__mazes[i].unhide_doors(hidden_doors)
+
+    def reset(self) -> array:
+        """Start new games in all environments. Return the observations."""
+        for i in range(self.num_envs):
+            self.__new_game(i)
+            self.__observe(i)
+            self.rewards[i] = 0.0
+            self.dones[i] = 0
+        return self.observations
+
+    def step(self, actions) -> tuple:
+        """Apply actions (a sequence of num_envs indexes in ACTIONS) to all games at once.
+        Return tuple (observations, rewards, dones).
+        """
+        if len(actions) != self.num_envs:
+            raise ValueError(f"expected {self.num_envs} actions, given: {len(actions)}")
+        robots = self.__robots
+        rewards = self.rewards
+        dones = self.dones
+        for i in range(self.num_envs):
+            robot = robots[i]
+            left, right, up, down, break_wall = ACTIONS[actions[i]]
+            robot.set_direction(left, right, up, down)
+            if break_wall:
+                robot.break_wall()
+            coins = robot.coins
+            robot.move_robot()
+            reward = (robot.coins - coins) * self.REWARD_COIN
+
+            for monster in self.__monsters[i]:
+                monster.move_monster()
+                if monster.game_status == "gameover":
+                    robot.game_status = "gameover"
+            self.__process_doors(i)
+
+            self.__steps[i] += 1
+            done = robot.game_status in ["gameover", "passed"]
+            if robot.game_status == "passed":
+                reward += self.REWARD_PASSED
+            elif robot.game_status == "gameover":
+                reward += self.REWARD_GAMEOVER
+            elif self.max_steps is not None and self.__steps[i] >= self.max_steps:
+                done = True
+
+            rewards[i] = reward
+            dones[i] = done
+            if done:
+                self.__new_game(i)
+            self.__observe(i)
+        return self.observations, rewards, dones
+
+
+if __name__ == "__main__":
+    from time import perf_counter
+    envs = VecTheWay(64, 31, 21, seed=1)
+    envs.reset()
+    steps = 200
+    start = perf_counter()
+    for _ in range(steps):
+        envs.step([random.randrange(len(ACTIONS)) for _ in range(envs.num_envs)])
+    elapsed = perf_counter() - start
+    print(f"{steps * envs.num_envs / elapsed:.0f} env-steps/sec")
@@ -0,0 +1,121 @@
+from __future__ import annotations
+#from typing import Self  # available from Python 3.11
+from maze import Maze
+
+
+# Transformations of the coordinates for the eight octants (xx, xy, yx, yy)
+OCTANTS = [
+    (1, 0, 0, -1), (0, -1, -1, 0), (0, 1, -1, 0), (-1, 0, 0, -1),
+    (-1, 0, 0, 1), (0, 1, 1, 0), (0, -1, 1, 0), (1, 0, 0, 1),
+]
+
+
+class FieldOfView:
+    """
+    FieldOfView(Maze) -> new FieldOfView object with radius 8.
+    FieldOfView(Maze, radius=R) -> new FieldOfView object with radius R.
+
+    FieldOfView computes the cells visible from a cell of the maze
+    (walls block the sight) with recursive shadowcasting:
+    http://www.roguebasin.com/index.php/FOV_using_recursive_shadowcasting
+
+    Results are cached per cell. When a wall appears or disappears in the maze
+    (FieldOfView listens to Maze.mark_cell()), only the cached results
+    which contain that cell are dropped.
+
+    Attributes:
+    radius, remembered (set of all cells which have been visible).
+
+    Methods:
+    visible(cell), invalidate(cell), close().
+    """
+    def __init__(self, maze: Maze, radius: int = 8) -> None:
+        self.__maze = maze
+        self.radius = radius
+        self.remembered = set()
+        # Visible cells: origin -> frozenset of cells
+        self.__cache = {}
+        # Reverse index: cell -> set of origins, from which the cell is visible
+        self.__seen_from = {}
+        maze.add_listener(self.__on_mark)
+
+    def __on_mark(self, cell: tuple, old_mark: int, mark: int) -> None:
+        wall = self.__maze.wall
+        if (old_mark == wall) != (mark == wall):
+            self.invalidate(cell)
+
+    def invalidate(self, cell: tuple) -> None:
+        """Drop the cached results, which contain the given cell."""
+        for origin in self.__seen_from.pop(cell, ()):
+            for visible_cell in self.__cache.pop(origin, ()):
+                if visible_cell != cell:
+                    self.__seen_from[visible_cell].discard(origin)
+
+    def visible(self, cell: tuple) -> frozenset:
+        """Return the set of cells visible from the given cell, add them to self.remembered."""
+        origin = (int(cell[0]), int(cell[1]))
+        visible_cells = self.__cache.get(origin)
+        if visible_cells is None:
+            visible_cells = self.__compute(origin)
+            self.__cache[origin] = visible_cells
+            for visible_cell in visible_cells:
+                self.__seen_from.setdefault(visible_cell, set()).add(origin)
+            self.remembered.update(visible_cells)
+        return visible_cells
+
+    def close(self) -> None:
+        """Stop listening to the maze changes."""
+        self.__maze.remove_listener(self.__on_mark)
+
+    def __is_blocked(self, x: int, y: int) -> bool:
+        if x < 0 or y < 0 or x >= self.__maze.width or y >= self.__maze.height:
+            return True
+        return self.__maze.maze[y][x] == self.__maze.wall
+
+    def __compute(self, origin: tuple) -> frozenset:
+        visible_cells = {origin}
+        for octant in OCTANTS:
+            self.__cast_light(origin, 1, 1.0, 0.0, octant, visible_cells)
+        return frozenset(visible_cells)
+
+    def __cast_light(self, origin: tuple, row: int, start: float, end: float,
+                     octant: tuple, visible_cells: set) -> None:
+        """Scan one octant row by row from the origin between the slopes start and end,
+        recursing into the parts of the next rows not shadowed by walls.
+        """
+        if start < end:
+            return
+        cx, cy = origin
+        xx, xy, yx, yy = octant
+        radius = self.radius
+        radius_squared = radius * radius
+        new_start = start
+        for j in range(row, radius + 1):
+            dx, dy = -j - 1, -j
+            blocked = False
+            while dx <= 0:
+                dx += 1
+                x = cx + dx*xx + dy*xy
+                y = cy + dx*yx + dy*yy
+                left_slope = (dx - 0.5) / (dy + 0.5)
+                right_slope = (dx + 0.5) / (dy - 0.5)
+                if start < right_slope:
+                    continue
+                if end > left_slope:
+                    break
+                if dx*dx + dy*dy <= radius_squared and 0 <= x < self.__maze.width and 0 <= y < self.__maze.height:
+                    visible_cells.add((x, y))
+                if blocked:
+                    # Scanning a row of walls
+                    if self.__is_blocked(x, y):
+                        new_start = right_slope
+                        continue
+                    blocked = False
+                    start = new_start
+                elif self.__is_blocked(x, y) and j < radius:
+                    # Wall starts: scan the next rows in the part before the wall
+                    blocked = True
+                    self.__cast_light(origin, j + 1, start, left_slope, octant, visible_cells)
+                    new_start = right_slope
+            if blocked:
+                break
@@ -0,0 +1,5 @@
+import os
+import sys
+
+# The modules of the game are flat modules in src (run as python main.py from there)
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "src"))
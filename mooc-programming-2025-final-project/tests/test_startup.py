@@ -0,0 +1,10 @@
+from startup_check import CORE_MODULES, check_import_time, measure_import_time
+
+
+def test_core_modules_do_not_import_pygame():
+    _, pygame_imported = measure_import_time(CORE_MODULES)
+    assert not pygame_imported
+
+
+def test_core_import_time():
+    check_import_time()